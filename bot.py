@@ -1,12 +1,39 @@
 import asyncio
 import logging
+import signal
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from middlewares.concurrency import ConcurrencyLimitMiddleware
 from middlewares.db import DatabaseSessionMiddleware
 
-from config import BOT_TOKEN
-from database.db import create_db, drop_db
+from config import (
+    BOT_TOKEN, TRANSLATOR_BACKEND, TRANSLATOR_FALLBACK, DEEPL_API_KEY, DEEPL_API_URL,
+    DEEPL_MAX_CONNECTIONS, DEEPL_MAX_CONNECTIONS_PER_HOST, DEEPL_KEEPALIVE_TIMEOUT, DEEPL_DNS_CACHE_TTL,
+    DEEPL_CONNECT_TIMEOUT, DEEPL_READ_TIMEOUT, DEEPL_TOTAL_TIMEOUT,
+    DEEPL_MAX_REQUESTS_PER_SECOND, DEEPL_MAX_CHARACTERS_PER_SECOND, DEEPL_MAX_RETRIES, DEEPL_BACKOFF_BASE,
+    DEEPL_BACKOFF_MAX, DEEPL_CHARACTER_QUOTA, DEEPL_QUOTA_RECHECK_INTERVAL, TRANSLATION_MEMORY_ENABLED,
+    LOCAL_TRANSLATOR_ENGINE, LOCAL_TRANSLATOR_WORKERS, LOCAL_TRANSLATOR_BATCH_WINDOW, LOCAL_TRANSLATOR_MAX_BATCH,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_SLOW_CALL_SECONDS, CIRCUIT_OPEN_SECONDS,
+    TRANSLATION_DEADLINE_SECONDS, TRANSLATION_HEDGING_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES,
+    BOT_MODE, UPDATES_CONCURRENCY, SHUTDOWN_TIMEOUT,
+    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_BASE_URL, WEBHOOK_SECRET
+)
+from database.db import AsyncSessionLocal, create_db, drop_db
+from services.backends import FallbackBackend, ProcessPoolBackend, create_backend
+from services.circuit_breaker import CircuitBreaker, CircuitBreakerBackend
+from services.hedging import HedgingBackend
+from services.retry_queue import retry_queue
+from services.send_queue import send_queue
+from services.media_groups import media_groups
+from services.routing import routing_table
+from services.stats_buffer import statistics_buffer, compact_statistics_periodically
+from services.translator import (
+    set_translation_backend, close_translation_backend, translation_backend_available,
+    prune_translation_memory_periodically
+)
 from handlers import translator, admin, private, logger  # ✅ Убрали лишние обработчики
 
 # ✅ Настраиваем логирование
@@ -16,6 +43,10 @@ logging.basicConfig(level=logging.INFO)
 bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
 dp = Dispatcher(storage=MemoryStorage())
 
+# ✅ Ограничиваем число одновременно обрабатываемых апдейтов
+updates_limiter = ConcurrencyLimitMiddleware(UPDATES_CONCURRENCY, media_groups=media_groups)
+dp.update.outer_middleware(updates_limiter)
+
 # ✅ Добавляем middleware для базы данных
 dp.update.middleware(DatabaseSessionMiddleware())
 
@@ -26,13 +57,157 @@ dp.include_router(admin.router)
 dp.include_router(logger.router)
 
 
+def create_local_backend():
+    """Локальный CPU-переводчик в пуле процессов."""
+    return ProcessPoolBackend(
+        LOCAL_TRANSLATOR_ENGINE,
+        workers=LOCAL_TRANSLATOR_WORKERS,
+        batch_window=LOCAL_TRANSLATOR_BATCH_WINDOW,
+        max_batch_size=LOCAL_TRANSLATOR_MAX_BATCH,
+    )
+
+
+# ✅ Собираем бэкенд перевода по конфигу
+def build_translation_backend():
+    if TRANSLATOR_BACKEND.lower() == ProcessPoolBackend.name:
+        backend = create_local_backend()
+    else:
+        # ✅ Один бэкенд DeepL (и один пул HTTP-соединений) на весь процесс
+        backend = create_backend(
+            TRANSLATOR_BACKEND,
+            api_key=DEEPL_API_KEY,
+            url=DEEPL_API_URL,
+            max_connections=DEEPL_MAX_CONNECTIONS,
+            max_connections_per_host=DEEPL_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=DEEPL_KEEPALIVE_TIMEOUT,
+            dns_cache_ttl=DEEPL_DNS_CACHE_TTL,
+            connect_timeout=DEEPL_CONNECT_TIMEOUT,
+            read_timeout=DEEPL_READ_TIMEOUT,
+            total_timeout=DEEPL_TOTAL_TIMEOUT,
+            max_requests_per_second=DEEPL_MAX_REQUESTS_PER_SECOND,
+            max_characters_per_second=DEEPL_MAX_CHARACTERS_PER_SECOND,
+            max_retries=DEEPL_MAX_RETRIES,
+            backoff_base=DEEPL_BACKOFF_BASE,
+            backoff_max=DEEPL_BACKOFF_MAX,
+            character_quota=DEEPL_CHARACTER_QUOTA,
+            quota_recheck_interval=DEEPL_QUOTA_RECHECK_INTERVAL,
+            deadline=TRANSLATION_DEADLINE_SECONDS,
+        )
+
+        # ✅ Когда кончится квота DeepL — переводим локально
+        if TRANSLATOR_FALLBACK.lower() == ProcessPoolBackend.name:
+            backend = FallbackBackend(backend, create_local_backend())
+
+    # ✅ Дедлайн на каждый вызов и hedged-дубль медленных запросов (хвост задержек)
+    backend = HedgingBackend(
+        backend,
+        deadline=TRANSLATION_DEADLINE_SECONDS,
+        hedging_enabled=TRANSLATION_HEDGING_ENABLED,
+        hedge_percentile=HEDGE_PERCENTILE,
+        hedge_min_delay=HEDGE_MIN_DELAY,
+        hedge_min_samples=HEDGE_MIN_SAMPLES,
+    )
+
+    # ✅ Circuit breaker: при сбоях бэкенда отказываем сразу, а не ждём таймаутов
+    return CircuitBreakerBackend(
+        backend,
+        CircuitBreaker(
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+            open_seconds=CIRCUIT_OPEN_SECONDS,
+        )
+    )
+
+
+def wait_for_stop_signal() -> asyncio.Event:
+    """Событие, которое срабатывает по SIGTERM/SIGINT (остановка контейнера, Ctrl+C)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: остаётся KeyboardInterrupt
+    return stop
+
+
+# ✅ Webhook: aiohttp-сервер принимает апдейты от Telegram.
+# Запускайте одну реплику: сбор альбомов, single-flight переводов и очередь повторов живут в памяти
+# процесса, и части альбома, попавшие на разные реплики, ушли бы в каналы неполными дублями.
+async def run_webhook():
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET or None,  # Неверный X-Telegram-Bot-Api-Secret-Token → 401
+        handle_in_background=True,  # Отвечаем Telegram сразу, обработка — в фоне (с лимитом updates_limiter)
+    ).register(app, path=WEBHOOK_PATH)
+
+    async def health(request: web.Request):
+        return web.json_response({"status": "ok", "updates": updates_limiter.stats(), "send_queue": send_queue.stats()})
+
+    app.router.add_get("/health", health)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    print(f"✅ Webhook слушает http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    if WEBHOOK_BASE_URL:
+        await bot.set_webhook(
+            url=f"{WEBHOOK_BASE_URL.rstrip('/')}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        print(f"🔗 Webhook зарегистрирован: {WEBHOOK_BASE_URL.rstrip('/')}{WEBHOOK_PATH}")
+
+    try:
+        await wait_for_stop_signal().wait()
+    finally:
+        # Сначала перестаём принимать запросы, затем дожидаемся уже принятых апдейтов
+        await runner.cleanup()
+        await updates_limiter.wait_idle(SHUTDOWN_TIMEOUT)
+
+
 # ✅ Запускаем бота
 async def main():
     await create_db()  # ✅ Создаём базу данных перед запуском бота
 
-    print("✅ Запустили бота")
+    async with AsyncSessionLocal() as session:
+        await routing_table.reload(session)  # ✅ Маршруты каналов — в память до первого поста
+
+    translation_backend = build_translation_backend()
+    set_translation_backend(translation_backend)
+    await translation_backend.refresh_usage()  # ✅ Синхронизируем счётчик квоты / прогреваем локальные воркеры
+
+    # ✅ Фоновые задачи: публикация отложенных постов, запись и сжатие статистики, очистка давно не использованных переводов
+    background_tasks = [
+        asyncio.create_task(retry_queue.run(translation_backend_available)),
+        asyncio.create_task(compact_statistics_periodically()),
+    ]
+    statistics_task = asyncio.create_task(statistics_buffer.run())  # Останавливается через close(), не cancel()
+    if TRANSLATION_MEMORY_ENABLED:
+        background_tasks.append(asyncio.create_task(prune_translation_memory_periodically()))
+
+    send_queue.start()  # ✅ Воркеры исходящих сообщений в Telegram
+
+    print(f"✅ Запустили бота ({BOT_MODE})")
 
-    await dp.start_polling(bot)
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook()
+        else:
+            await bot.delete_webhook()  # Telegram не отдаёт апдейты в polling, пока установлен webhook
+            await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await send_queue.close(SHUTDOWN_TIMEOUT)  # ✅ Досылаем то, что уже стоит в очереди
+        await statistics_buffer.close()  # ✅ Последний сброс статистики
+        await statistics_task
+        await close_translation_backend()  # ✅ Закрываем соединения бэкенда при остановке
+        await bot.session.close()
 
 if __name__ == "__main__":
     asyncio.run(main())  # ✅ Стандартный запуск
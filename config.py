@@ -16,3 +16,106 @@ if not DB_URL:
     print("❌ Ошибка: DATABASE_URL не задан в .env!")
 if not DEEPL_API_KEY:
     print("⚠ Внимание: DEEPL_API_KEY не задан в .env (перевод может не работать).")
+
+
+# ✅ Бэкенд перевода: auto (Free/Pro по ключу), deepl-free, deepl-pro
+TRANSLATOR_BACKEND = os.getenv("TRANSLATOR_BACKEND", "auto")
+DEEPL_API_URL = os.getenv("DEEPL_API_URL")  # Переопределить эндпоинт (например, локальный fake-DeepL)
+
+# ✅ Настройки HTTP-клиента DeepL (один пул соединений на весь процесс)
+DEEPL_MAX_CONNECTIONS = int(os.getenv("DEEPL_MAX_CONNECTIONS", "20"))  # Всего соединений в пуле
+DEEPL_MAX_CONNECTIONS_PER_HOST = int(os.getenv("DEEPL_MAX_CONNECTIONS_PER_HOST", "10"))  # Соединений на один хост
+DEEPL_KEEPALIVE_TIMEOUT = float(os.getenv("DEEPL_KEEPALIVE_TIMEOUT", "60"))  # Сколько держим простаивающее соединение (сек)
+DEEPL_DNS_CACHE_TTL = int(os.getenv("DEEPL_DNS_CACHE_TTL", "300"))  # Кэш DNS (сек)
+DEEPL_CONNECT_TIMEOUT = float(os.getenv("DEEPL_CONNECT_TIMEOUT", "5"))  # Таймаут на установку соединения (сек)
+DEEPL_READ_TIMEOUT = float(os.getenv("DEEPL_READ_TIMEOUT", "10"))  # Таймаут на чтение ответа (сек)
+DEEPL_TOTAL_TIMEOUT = float(os.getenv("DEEPL_TOTAL_TIMEOUT", "10"))  # Общий таймаут одного запроса (сек), см. TRANSLATION_DEADLINE_SECONDS
+
+# ✅ Параллельность рассылки по каналам
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "5"))  # Сколько языков переводим одновременно
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "5"))  # Воркеров очереди отправки (сколько чатов обслуживаем одновременно)
+
+# ✅ Кэш переводов в памяти (LRU + TTL)
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))  # Максимум записей
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "86400"))  # Время жизни записи (сек)
+TRANSLATION_CACHE_MAX_TEXT_LENGTH = int(os.getenv("TRANSLATION_CACHE_MAX_TEXT_LENGTH", "2000"))  # Длинные тексты не кэшируем
+
+# ✅ Память переводов в БД
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY_ENABLED", "1") == "1"
+TRANSLATION_MEMORY_MAX_AGE_DAYS = int(os.getenv("TRANSLATION_MEMORY_MAX_AGE_DAYS", "90"))  # Удаляем записи, не использованные N дней
+TRANSLATION_MEMORY_PRUNE_INTERVAL = float(os.getenv("TRANSLATION_MEMORY_PRUNE_INTERVAL", "21600"))  # Как часто чистим (сек)
+
+# ✅ Лимиты и повторы запросов к DeepL
+DEEPL_MAX_REQUESTS_PER_SECOND = float(os.getenv("DEEPL_MAX_REQUESTS_PER_SECOND", "5"))  # 0 — без ограничения
+DEEPL_MAX_CHARACTERS_PER_SECOND = float(os.getenv("DEEPL_MAX_CHARACTERS_PER_SECOND", "20000"))  # 0 — без ограничения
+DEEPL_MAX_RETRIES = int(os.getenv("DEEPL_MAX_RETRIES", "4"))  # Повторы при 429/5xx/таймаутах
+DEEPL_BACKOFF_BASE = float(os.getenv("DEEPL_BACKOFF_BASE", "0.5"))  # Первая пауза перед повтором (сек)
+DEEPL_BACKOFF_MAX = float(os.getenv("DEEPL_BACKOFF_MAX", "5"))  # Максимальная пауза (сек); Retry-After дольше — ошибка сразу
+DEEPL_CHARACTER_QUOTA = int(os.getenv("DEEPL_CHARACTER_QUOTA", "0"))  # Локальный лимит символов (0 — берём из /v2/usage)
+DEEPL_QUOTA_RECHECK_INTERVAL = float(os.getenv("DEEPL_QUOTA_RECHECK_INTERVAL", "300"))  # Как часто (сек) проверяем /v2/usage, пока квота исчерпана
+
+# ✅ Circuit breaker бэкенда перевода
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # Ошибок/медленных вызовов подряд до размыкания
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))  # Вызов дольше — считается сбоем
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))  # Сколько держим цепь разомкнутой до пробного вызова
+
+# ✅ Отложенная публикация постов, которые не удалось перевести
+RETRY_QUEUE_MAX_SIZE = int(os.getenv("RETRY_QUEUE_MAX_SIZE", "200"))  # Максимум отложенных задач
+RETRY_QUEUE_MAX_ATTEMPTS = int(os.getenv("RETRY_QUEUE_MAX_ATTEMPTS", "10"))  # Попыток на задачу
+RETRY_QUEUE_TTL = float(os.getenv("RETRY_QUEUE_TTL", "21600"))  # Через сколько секунд задача устаревает
+RETRY_QUEUE_INTERVAL = float(os.getenv("RETRY_QUEUE_INTERVAL", "5"))  # Как часто проверяем очередь (сек)
+
+# ✅ Дедлайны и hedged-запросы к бэкенду перевода
+# Дедлайн должен быть больше DEEPL_TOTAL_TIMEOUT + DEEPL_BACKOFF_MAX, иначе повтор не успеет начаться
+# (по умолчанию 30 > 10 + 5: запрос, пауза и ещё один запрос). DeepL сам не повторяет запрос, который не успеет до дедлайна
+TRANSLATION_DEADLINE_SECONDS = float(os.getenv("TRANSLATION_DEADLINE_SECONDS", "30"))  # Предел на вызов вместе с повторами (0 — без предела)
+TRANSLATION_HEDGING_ENABLED = os.getenv("TRANSLATION_HEDGING_ENABLED", "0") == "1"  # Дублировать медленные запросы
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))  # Дубль уходит после этого перцентиля задержки
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.3"))  # Не раньше, чем через столько секунд
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))  # Пока замеров меньше — не дублируем
+
+# ✅ Локальный CPU-переводчик (TRANSLATOR_BACKEND=local или запасной при исчерпании квоты DeepL)
+LOCAL_TRANSLATOR_ENGINE = os.getenv("LOCAL_TRANSLATOR_ENGINE")  # модуль:фабрика (обязателен для local)
+LOCAL_TRANSLATOR_WORKERS = int(os.getenv("LOCAL_TRANSLATOR_WORKERS", "0"))  # 0 — по числу ядер
+LOCAL_TRANSLATOR_BATCH_WINDOW = float(os.getenv("LOCAL_TRANSLATOR_BATCH_WINDOW", "0.02"))  # Окно склейки пачки (сек)
+LOCAL_TRANSLATOR_MAX_BATCH = int(os.getenv("LOCAL_TRANSLATOR_MAX_BATCH", "64"))  # Максимум текстов в пачке
+TRANSLATOR_FALLBACK = os.getenv("TRANSLATOR_FALLBACK", "")  # local — переводить локально, когда кончилась квота DeepL
+if "local" in (TRANSLATOR_BACKEND.lower(), TRANSLATOR_FALLBACK.lower()) and not LOCAL_TRANSLATOR_ENGINE:
+    print("❌ Ошибка: LOCAL_TRANSLATOR_ENGINE не задан в .env (нужен для локального переводчика)!")
+
+# ✅ Язык оригинала
+SOURCE_LANGUAGE_DETECTION = os.getenv("SOURCE_LANGUAGE_DETECTION", "1") == "1"  # Локально определять язык и не переводить текст на тот же язык
+
+# ✅ Очередь отправки в Telegram (лимиты Bot API)
+TELEGRAM_GLOBAL_PER_SECOND = float(os.getenv("TELEGRAM_GLOBAL_PER_SECOND", "25"))  # Сообщений в секунду на весь бот
+TELEGRAM_CHAT_PER_MINUTE = float(os.getenv("TELEGRAM_CHAT_PER_MINUTE", "20"))  # Сообщений в минуту в один чат/канал
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "5"))  # Сколько сообщений подряд можно отправить в чат без паузы
+TELEGRAM_MAX_FLOOD_RETRIES = int(os.getenv("TELEGRAM_MAX_FLOOD_RETRIES", "5"))  # Повторов после TelegramRetryAfter
+
+# ✅ Сборка альбомов (медиа-групп)
+MEDIA_GROUP_QUIET_PERIOD = float(os.getenv("MEDIA_GROUP_QUIET_PERIOD", "1"))  # Альбом готов, если части не приходят столько секунд
+MEDIA_GROUP_MAX_WAIT = float(os.getenv("MEDIA_GROUP_MAX_WAIT", "5"))  # Дольше этого альбом не ждём
+MEDIA_GROUP_MAX_PENDING = int(os.getenv("MEDIA_GROUP_MAX_PENDING", "500"))  # Максимум одновременно собираемых альбомов
+MEDIA_GROUP_SEEN_TTL = float(os.getenv("MEDIA_GROUP_SEEN_TTL", "60"))  # Сколько помним опубликованные альбомы (отсекаем опоздавшие части)
+
+# ✅ Режим получения апдейтов
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()  # polling или webhook
+UPDATES_CONCURRENCY = int(os.getenv("UPDATES_CONCURRENCY", "50"))  # Сколько апдейтов обрабатываем одновременно (0 — без ограничения)
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "10"))  # Сколько ждём принятые апдейты при остановке (сек)
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")  # Адрес, на котором слушает веб-сервер
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")  # Публичный https-адрес; если задан — бот сам вызывает setWebhook
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # Проверяется в заголовке X-Telegram-Bot-Api-Secret-Token
+
+if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+    print("⚠ Внимание: WEBHOOK_SECRET не задан — вебхук примет апдейты от кого угодно.")
+
+# ✅ Кэш маршрутов (главный канал → каналы для переводов)
+ROUTING_CACHE_TTL = float(os.getenv("ROUTING_CACHE_TTL", "300"))  # Перечитывать из БД раз в столько секунд (0 — только после изменений в админке)
+
+# ✅ Статистика пишется в БД пачками (write-behind)
+STATS_MAX_STALENESS = float(os.getenv("STATS_MAX_STALENESS", "10"))  # Насколько (сек) статистика в БД может отставать (0 — писать сразу после поста)
+STATS_HOURLY_RETENTION_DAYS = int(os.getenv("STATS_HOURLY_RETENTION_DAYS", "7"))  # Сколько дней хранить почасовую статистику (дальше — по дням)
+STATS_DAILY_RETENTION_DAYS = int(os.getenv("STATS_DAILY_RETENTION_DAYS", "400"))  # Сколько дней хранить статистику по дням (0 — всегда)
+STATS_COMPACTION_INTERVAL = float(os.getenv("STATS_COMPACTION_INTERVAL", "3600"))  # Как часто сворачиваем старые срезы (сек)
@@ -1,8 +1,10 @@
 import asyncpg
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 from config import DB_URL
+from database.migrations import MIGRATIONS_LOCK_ID, run_migrations
 
 # Создаём асинхронный движок
 engine = create_async_engine(DB_URL, echo=True)
@@ -34,9 +36,13 @@ async def create_db():
         return
 
     async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
         await conn.run_sync(SQLModel.metadata.create_all)
         print("✅ Таблицы обновлены!")
 
+        # ✅ Индексы, ограничения и перенос данных для уже существующих таблиц
+        await run_migrations(conn)
+
 
 # Удаляет все таблицы в БД
 async def drop_db():
@@ -0,0 +1,130 @@
+"""Сравнивает планы горячих запросов бота с индексами и без них (EXPLAIN ANALYZE).
+
+Запуск (нужна та же БД, что у бота, DATABASE_URL из .env):
+    python -m database.explain_queries --tenants 20000 --channels-per-tenant 5
+
+Тестовые данные и удаление индексов делаются в одной транзакции, которая в конце
+откатывается, — рабочие данные не меняются. Но DROP INDEX блокирует таблицы до конца прогона,
+поэтому запускайте на копии базы или когда бот остановлен.
+"""
+import argparse
+import asyncio
+import re
+from sqlalchemy import text
+from database.db import create_db, engine
+
+BENCH_USER_BASE = 9_000_000_000
+BENCH_CHAT_BASE = -1_009_000_000_000
+
+# Индексы, которые проверяем (как в models.py / migrations.py)
+INDEXES = [
+    "ix_main_channels_chat_id",
+    "ix_channels_chat_id",
+    "ix_channels_user_id",
+    "ix_channels_user_chat",
+    "ix_settings_user_key",
+    "ix_statistics_user_id",
+]
+
+# ✅ Запросы горячего пути: маршрут поста, каналы владельца, настройка, статистика
+QUERIES = {
+    "маршрут по chat_id": "SELECT chat_id, user_id FROM main_channels WHERE chat_id = :chat_id",
+    "каналы владельца": "SELECT user_id, chat_id, language FROM channels WHERE user_id = :user_id",
+    "канал по chat_id": "SELECT * FROM channels WHERE chat_id = :chat_id",
+    "настройка пользователя": "SELECT value FROM settings WHERE user_id = :user_id AND key = 'AUTO_TRANSLATE_ENABLED'",
+    "статистика пользователя": "SELECT * FROM statistics WHERE user_id = :user_id",
+}
+
+EXECUTION_TIME_RE = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+async def seed(conn, tenants: int, channels_per_tenant: int):
+    params = {"tenants": tenants, "per_tenant": channels_per_tenant, "users": BENCH_USER_BASE, "chats": BENCH_CHAT_BASE}
+    await conn.execute(text("""
+        INSERT INTO users (user_id, username, phone_number, is_admin)
+        SELECT :users + g, 'bench' || g, '-', false FROM generate_series(1, :tenants) AS g
+    """), params)
+    await conn.execute(text("""
+        INSERT INTO channels (user_id, name, chat_id, language)
+        SELECT :users + g, 'bench', :chats - (g * 100 + c), 'EN'
+        FROM generate_series(1, :tenants) AS g, generate_series(0, :per_tenant - 1) AS c
+    """), params)
+    await conn.execute(text("""
+        INSERT INTO main_channels (user_id, chat_id)
+        SELECT :users + g, :chats - g * 100 FROM generate_series(1, :tenants) AS g
+    """), params)
+    await conn.execute(text("""
+        INSERT INTO settings (user_id, key, value)
+        SELECT :users + g, k, '1'
+        FROM generate_series(1, :tenants) AS g, unnest(ARRAY['AUTO_TRANSLATE_ENABLED', 'MAIN_CHANNEL_ID']) AS k
+    """), params)
+    await conn.execute(text("""
+        INSERT INTO statistics (user_id, messages_sent, words_translated, characters_translated)
+        SELECT :users + g, 0, 0, 0 FROM generate_series(1, :tenants) AS g
+    """), params)
+    for table in ("users", "channels", "main_channels", "settings", "statistics"):
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def explain_all(conn, params: dict, repeat: int) -> dict:
+    """Возвращает {запрос: (первая строка плана, лучшее время выполнения в мс)}."""
+    results = {}
+    for name, query in QUERIES.items():
+        best, top_node = None, ""
+        for _ in range(repeat):
+            plan = [row[0] for row in await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), params)]
+            top_node = plan[0].strip()
+            match = next((EXECUTION_TIME_RE.search(line) for line in plan if EXECUTION_TIME_RE.search(line)), None)
+            if match:
+                elapsed = float(match.group(1))
+                best = elapsed if best is None else min(best, elapsed)
+        results[name] = (top_node, best)
+    return results
+
+
+def print_results(title: str, results: dict):
+    print(f"\n📊 {title}")
+    for name, (top_node, elapsed) in results.items():
+        print(f"  {name:<25} {elapsed:>9.3f} мс  {top_node}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE горячих запросов с индексами и без")
+    parser.add_argument("--tenants", type=int, default=20000, help="Сколько тестовых владельцев создать")
+    parser.add_argument("--channels-per-tenant", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов каждого запроса (берём лучший)")
+    args = parser.parse_args()
+
+    await create_db()  # Схема и миграции должны быть применены
+
+    # Ищем владельца из середины тестовых данных
+    middle = args.tenants // 2 or 1
+    params = {"user_id": BENCH_USER_BASE + middle, "chat_id": BENCH_CHAT_BASE - middle * 100}
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            print(f"🌱 Тестовые данные: {args.tenants} владельцев × {args.channels_per_tenant} каналов")
+            await seed(conn, args.tenants, args.channels_per_tenant)
+            with_indexes = await explain_all(conn, params, args.repeat)
+
+            for index in INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            without_indexes = await explain_all(conn, params, args.repeat)
+        finally:
+            await transaction.rollback()  # ✅ Ни данные, ни удалённые индексы не сохраняются
+
+    print_results("Без индексов", without_indexes)
+    print_results("С индексами", with_indexes)
+
+    print("\n⚡ Ускорение:")
+    for name in QUERIES:
+        before, after = without_indexes[name][1], with_indexes[name][1]
+        if before and after:
+            print(f"  {name:<25} ×{before / after:.1f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Ключ advisory-lock: реплики бота, запущенные одновременно, применяют миграции по очереди
+MIGRATIONS_LOCK_ID = 72_416_001
+
+# ✅ Миграции схемы: (версия, описание, SQL-команды). Новые миграции — только в конец списка.
+# Команды должны быть идемпотентными: на новой базе create_all уже создал те же индексы.
+MIGRATIONS = [
+    (1, "Главные каналы из настроек MAIN_CHANNEL_ID → main_channels", [
+        """
+        INSERT INTO main_channels (user_id, chat_id)
+        SELECT DISTINCT ON (user_id) user_id, CAST(value AS BIGINT)
+        FROM settings
+        WHERE key = 'MAIN_CHANNEL_ID' AND value ~ '^-?[0-9]+$'
+        ORDER BY user_id, id DESC
+        ON CONFLICT (user_id) DO NOTHING
+        """,
+    ]),
+    (2, "Индексы channels по chat_id и user_id", [
+        "CREATE INDEX IF NOT EXISTS ix_channels_chat_id ON channels (chat_id)",
+        "CREATE INDEX IF NOT EXISTS ix_channels_user_id ON channels (user_id)",
+    ]),
+    (3, "Уникальная настройка на (user_id, key)", [
+        # Из дублей оставляем последнюю запись
+        """
+        DELETE FROM settings AS old
+        USING settings AS new
+        WHERE old.user_id = new.user_id AND old.key = new.key AND old.id < new.id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_settings_user_key ON settings (user_id, key)",
+    ]),
+    (4, "Одна строка статистики на пользователя", [
+        # Дубли складываем в последнюю строку, остальные удаляем
+        """
+        WITH totals AS (
+            SELECT user_id, MAX(id) AS keep_id,
+                   SUM(messages_sent) AS messages_sent,
+                   SUM(words_translated) AS words_translated,
+                   SUM(characters_translated) AS characters_translated
+            FROM statistics
+            GROUP BY user_id
+            HAVING COUNT(*) > 1
+        )
+        UPDATE statistics AS stat
+        SET messages_sent = totals.messages_sent,
+            words_translated = totals.words_translated,
+            characters_translated = totals.characters_translated
+        FROM totals
+        WHERE stat.id = totals.keep_id
+        """,
+        """
+        DELETE FROM statistics AS old
+        USING statistics AS new
+        WHERE old.user_id = new.user_id AND old.id < new.id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_statistics_user_id ON statistics (user_id)",
+    ]),
+    (5, "Уникальный канал на (user_id, chat_id)", [
+        # Из дублей оставляем последнюю запись
+        """
+        DELETE FROM channels AS old
+        USING channels AS new
+        WHERE old.user_id = new.user_id AND old.chat_id = new.chat_id AND old.id < new.id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_channels_user_chat ON channels (user_id, chat_id)",
+    ]),
+]
+
+
+async def run_migrations(conn: AsyncConnection):
+    """Применяет недостающие миграции внутри транзакции `conn` (вызывается из create_db)."""
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    applied = {row[0] for row in result}
+
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"🛠 Миграция {version}: {name}")
+        for statement in statements:
+            await conn.execute(text(statement))
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+
+    print(f"✅ Схема БД: версия {max((version for version, _, _ in MIGRATIONS), default=0)}")
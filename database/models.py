@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, BigInteger, String, ForeignKey, Boolean, func
+from sqlalchemy import Column, DateTime, BigInteger, String, Text, Integer, ForeignKey, Boolean, Index, func
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 
@@ -20,11 +20,14 @@ class User(SQLModel, table=True):
 # ✅ Модель каналов
 class Channel(SQLModel, table=True):
     __tablename__ = "channels"
+    __table_args__ = (
+        Index("ix_channels_user_chat", "user_id", "chat_id", unique=True),  # Канал добавляется пользователю один раз
+    )
 
     id: int = Field(default=None, primary_key=True)
-    user_id: int = Field(sa_column=Column(BigInteger, ForeignKey("users.user_id"), nullable=False))
+    user_id: int = Field(sa_column=Column(BigInteger, ForeignKey("users.user_id"), nullable=False, index=True))
     name: str = Field(nullable=False, max_length=50)
-    chat_id: int = Field(sa_column=Column(BigInteger, nullable=False))
+    chat_id: int = Field(sa_column=Column(BigInteger, nullable=False, index=True))
     language: str = Field(nullable=False, max_length=10)
     description: str = Field(default=None, nullable=True, max_length=255)
 
@@ -36,6 +39,9 @@ class Channel(SQLModel, table=True):
 # ✅ Модель настроек
 class Settings(SQLModel, table=True):
     __tablename__ = "settings"
+    __table_args__ = (
+        Index("ix_settings_user_key", "user_id", "key", unique=True),
+    )
 
     id: int = Field(default=None, primary_key=True)
     user_id: int = Field(sa_column=Column(BigInteger, ForeignKey("users.user_id"), nullable=False))
@@ -48,9 +54,24 @@ class Settings(SQLModel, table=True):
     updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now()))
 
 
+# ✅ Главные каналы владельцев: по chat_id поста сразу находим, чьи это каналы (индекс по chat_id)
+class MainChannel(SQLModel, table=True):
+    __tablename__ = "main_channels"
+
+    id: int = Field(default=None, primary_key=True)
+    user_id: int = Field(sa_column=Column(BigInteger, ForeignKey("users.user_id"), nullable=False, unique=True))
+    chat_id: int = Field(sa_column=Column(BigInteger, nullable=False, index=True))
+
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), server_default=func.now()))
+    updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now()))
+
+
 # ✅ Модель статистики
 class Statistics(SQLModel, table=True):
     __tablename__ = "statistics"
+    __table_args__ = (
+        Index("ix_statistics_user_id", "user_id", unique=True),
+    )
 
     id: int = Field(default=None, primary_key=True)
     user_id: int = Field(sa_column=Column(BigInteger, ForeignKey("users.user_id"), nullable=False))
@@ -61,3 +82,44 @@ class Statistics(SQLModel, table=True):
     # ✅ Явно добавляем `created_at` и `updated_at`
     created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), server_default=func.now()))
     updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now()))
+
+
+# ✅ Статистика по часам/дням в разрезе канала и языка (свежие данные — по часам, старые сворачиваются в дни)
+class StatisticsBucket(SQLModel, table=True):
+    __tablename__ = "statistics_buckets"
+    __table_args__ = (
+        Index("ix_statistics_buckets_key", "user_id", "chat_id", "language", "granularity", "bucket_start", unique=True),
+        Index("ix_statistics_buckets_user_start", "user_id", "bucket_start"),
+        Index("ix_statistics_buckets_granularity_start", "granularity", "bucket_start"),
+    )
+
+    id: int = Field(default=None, primary_key=True)
+    user_id: int = Field(sa_column=Column(BigInteger, nullable=False))  # Владелец (без FK: история остаётся после удаления канала)
+    chat_id: int = Field(sa_column=Column(BigInteger, nullable=False))  # Канал, куда ушёл перевод
+    language: str = Field(sa_column=Column(String(10), nullable=False))
+    granularity: str = Field(sa_column=Column(String(5), nullable=False))  # "hour" или "day"
+    bucket_start: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))  # Начало часа/дня (UTC)
+    messages: int = Field(sa_column=Column(BigInteger, default=0, server_default="0", nullable=False))
+    words: int = Field(sa_column=Column(BigInteger, default=0, server_default="0", nullable=False))
+    characters: int = Field(sa_column=Column(BigInteger, default=0, server_default="0", nullable=False))
+    billed_characters: int = Field(sa_column=Column(BigInteger, default=0, server_default="0", nullable=False))  # Ушло в DeepL (без кэша)
+
+    updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now()))
+
+
+# ✅ Память переводов (переживает перезапуски и общая для всех воркеров)
+class TranslationMemory(SQLModel, table=True):
+    __tablename__ = "translation_memory"
+    __table_args__ = (
+        Index("ix_translation_memory_hash_lang", "source_hash", "target_lang", unique=True),
+    )
+
+    id: int = Field(default=None, primary_key=True)
+    source_hash: str = Field(sa_column=Column(String(64), nullable=False))
+    source_text: str = Field(sa_column=Column(Text, nullable=False))
+    target_lang: str = Field(sa_column=Column(String(10), nullable=False))
+    translated_text: str = Field(sa_column=Column(Text, nullable=False))
+    hit_count: int = Field(sa_column=Column(Integer, default=0, server_default="0", nullable=False))
+    last_used_at: datetime = Field(sa_column=Column(DateTime(timezone=True), server_default=func.now(), index=True))
+
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), server_default=func.now()))
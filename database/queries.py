@@ -1,11 +1,12 @@
 import asyncio
-import traceback
-from sqlalchemy import BigInteger, cast
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import BigInteger, cast, func, text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from sqlalchemy.future import select
 from sqlalchemy.sql.expression import delete
-from database.models import Channel, Settings, Statistics, User
+from database.models import Channel, MainChannel, Settings, Statistics, StatisticsBucket, TranslationMemory, User
 
 
 # ✅ Получаем пользователя по chat_id
@@ -64,22 +65,20 @@ async def orm_add_channel(session: AsyncSession, user_id: int, chat_id: int, nam
     try:
         print(f"🔍 Добавление канала: user_id={user_id}, chat_id={chat_id}, name={name}, language={language}")
 
-        # Проверяем, есть ли канал в базе
-        result = await session.execute(
-            select(Channel).where(Channel.user_id == user_id, Channel.chat_id == chat_id)
-        )
-        existing_channel = result.scalar_one_or_none()
+        # Добавляем канал; если он уже есть у пользователя, уникальный индекс не даст создать дубль
+        stmt = insert(Channel).values(
+            user_id=user_id, chat_id=chat_id, name=name, language=language
+        ).on_conflict_do_nothing(
+            index_elements=[Channel.user_id, Channel.chat_id]
+        ).returning(Channel.id)
+        result = await session.execute(stmt)
+        channel_id = result.scalar_one_or_none()
+        await session.commit()  # 🔥 Здесь могло быть исключение
 
-        if existing_channel:
+        if channel_id is None:
             print(f"❌ Канал {chat_id} уже существует у user_id {user_id}")
             return False
 
-        # Добавляем канал
-        new_channel = Channel(user_id=user_id, chat_id=chat_id, name=name, language=language)
-        session.add(new_channel)
-        print("📌 Данные добавлены в сессию, готовим commit()...")
-
-        await session.commit()  # 🔥 Здесь могло быть исключение
         print(f"✅ Канал {chat_id} добавлен в базу")
         return True
 
@@ -89,17 +88,21 @@ async def orm_add_channel(session: AsyncSession, user_id: int, chat_id: int, nam
         return False
 
 
-# Удаляем канал из БД
-async def orm_delete_channel(session: AsyncSession, chat_id):
+# Удаляем канал пользователя из БД (тот же канал у других владельцев не трогаем)
+async def orm_delete_channel(session: AsyncSession, chat_id, user_id: int):
     try:
         chat_id = int(chat_id)  # ✅ Приводим `chat_id` к `int`
         result = await session.execute(
-            select(Channel).where(Channel.chat_id == chat_id)
+            select(Channel).where(Channel.chat_id == chat_id, Channel.user_id == user_id)
         )
         channel = result.scalar_one_or_none()
 
         if channel:
             await session.delete(channel)
+            # Удалённый канал больше не может быть главным у этого пользователя
+            await session.execute(
+                delete(MainChannel).where(MainChannel.chat_id == chat_id, MainChannel.user_id == user_id)
+            )
             await session.commit()
             print(f"✅ Канал {chat_id} удален")
             return True
@@ -137,16 +140,11 @@ async def orm_get_all_channels(session, user_id: int):
 
 ###########     Настройки (автоперевод)      ###########
 
-# ✅ Получить настройку
-async def orm_get_setting(session: AsyncSession, key: str, user_id: int = None):
-    if user_id:
-        result = await session.execute(
-            select(Settings.value).where(Settings.user_id == user_id, Settings.key == key)
-        )
-    else:
-        result = await session.execute(
-            select(Settings.value).where(Settings.key == key)  # 📌 Ищем без user_id
-        )
+# ✅ Получить настройку (настройки у каждого пользователя свои, поэтому user_id обязателен)
+async def orm_get_setting(session: AsyncSession, key: str, user_id: int):
+    result = await session.execute(
+        select(Settings.value).where(Settings.user_id == user_id, Settings.key == key)
+    )
 
     setting = result.scalar()
 
@@ -160,22 +158,68 @@ async def orm_get_setting(session: AsyncSession, key: str, user_id: int = None):
 
 
 
-# ✅ Установить настройку
+# ✅ Установить настройку (одна запись на (user_id, key) — upsert одним запросом)
 async def orm_set_setting(session: AsyncSession, key: str, value: str, user_id: int):
-    existing_setting = await session.execute(
-        select(Settings).where(Settings.key == key, Settings.user_id == user_id)
+    stmt = insert(Settings).values(key=key, value=value, user_id=user_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Settings.user_id, Settings.key],
+        set_={"value": stmt.excluded.value, "updated_at": func.now()}
     )
-    setting = existing_setting.scalars().first()
+    await session.execute(stmt)
+    await session.commit()
 
-    if setting:
-        setting.value = value  # ✅ Обновляем значение
-    else:
-        new_setting = Settings(key=key, value=value, user_id=user_id)  # ✅ Создаем новую запись
-        session.add(new_setting)
 
+
+
+
+###########     Главные каналы и маршруты      ###########
+
+# ✅ Главный канал пользователя (chat_id или None)
+async def orm_get_main_channel(session: AsyncSession, user_id: int):
+    result = await session.execute(select(MainChannel.chat_id).where(MainChannel.user_id == user_id))
+    return result.scalar()
+
+
+# ✅ Назначить главный канал (у пользователя он один — повторный вызов заменяет его)
+async def orm_set_main_channel(session: AsyncSession, user_id: int, chat_id: int):
+    stmt = insert(MainChannel).values(user_id=user_id, chat_id=chat_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MainChannel.user_id],
+        set_={"chat_id": stmt.excluded.chat_id, "updated_at": func.now()}
+    )
+    await session.execute(stmt)
     await session.commit()
 
 
+# ✅ Маршруты: главный канал → владельцы и их остальные каналы (все сразу или для одного chat_id — по индексу)
+async def orm_get_routes(session: AsyncSession, chat_id: int = None):
+    """Возвращает {chat_id главного канала: [(owner_id, [(chat_id, language), ...]), ...]}."""
+    query = select(MainChannel.chat_id, MainChannel.user_id)
+    if chat_id is not None:
+        query = query.where(MainChannel.chat_id == chat_id)
+    main_channels = (await session.execute(query)).all()
+    if not main_channels:
+        return {}
+
+    owners = {main.user_id for main in main_channels}
+    channels = await session.execute(
+        select(Channel.user_id, Channel.chat_id, Channel.language).where(Channel.user_id.in_(owners))
+    )
+    channels_by_owner = {}
+    for channel in channels.all():
+        channels_by_owner.setdefault(channel.user_id, []).append((channel.chat_id, channel.language))
+
+    routes = {}
+    for main in main_channels:
+        targets = [
+            (target_chat_id, language)
+            for target_chat_id, language in channels_by_owner.get(main.user_id, [])
+            if target_chat_id != main.chat_id
+        ]
+        routes.setdefault(main.chat_id, []).append((main.user_id, targets))
+    return routes
+
+
 
 
 
@@ -201,39 +245,196 @@ async def orm_get_statistics(session: AsyncSession, user_id: int):
 
 
 
-# ✅ Обновляем статистику (увеличиваем счётчики)
-async def orm_update_statistics(session: AsyncSession, user_id: int, text: str = None):
-    try:
-        print(f"🚀 Начинаем обновление статистики для user_id={user_id}")
+# ✅ Upsert-инкремент итогов пользователей: x = x + excluded.x
+def statistics_increment_stmt(increments: dict):
+    """increments — {user_id: (сообщений, слов, символов)}."""
+    stmt = insert(Statistics).values([
+        {
+            "user_id": user_id,
+            "messages_sent": messages,
+            "words_translated": words,
+            "characters_translated": characters,
+        }
+        for user_id, (messages, words, characters) in increments.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Statistics.user_id],
+        set_={
+            "messages_sent": Statistics.messages_sent + stmt.excluded.messages_sent,
+            "words_translated": Statistics.words_translated + stmt.excluded.words_translated,
+            "characters_translated": Statistics.characters_translated + stmt.excluded.characters_translated,
+            "updated_at": func.now(),
+        }
+    )
+    return stmt
+
+
+# ✅ Upsert-инкремент часовых срезов (владелец, канал, язык, час)
+def statistics_buckets_increment_stmt(increments: dict, granularity: str = "hour"):
+    """increments — {(user_id, chat_id, язык, начало часа): (сообщений, слов, символов, оплачиваемых символов)}."""
+    stmt = insert(StatisticsBucket).values([
+        {
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "language": language,
+            "granularity": granularity,
+            "bucket_start": bucket_start,
+            "messages": messages,
+            "words": words,
+            "characters": characters,
+            "billed_characters": billed_characters,
+        }
+        for (user_id, chat_id, language, bucket_start), (messages, words, characters, billed_characters) in increments.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            StatisticsBucket.user_id, StatisticsBucket.chat_id, StatisticsBucket.language,
+            StatisticsBucket.granularity, StatisticsBucket.bucket_start
+        ],
+        set_={
+            "messages": StatisticsBucket.messages + stmt.excluded.messages,
+            "words": StatisticsBucket.words + stmt.excluded.words,
+            "characters": StatisticsBucket.characters + stmt.excluded.characters,
+            "billed_characters": StatisticsBucket.billed_characters + stmt.excluded.billed_characters,
+            "updated_at": func.now(),
+        }
+    )
 
-        # 🔍 Проверяем, существует ли статистика
-        result = await session.execute(select(Statistics).where(Statistics.user_id == user_id))
-        stat = result.scalars().first()
 
-        word_count = len(text.split()) if text else 0  # 🔥 Количество слов
-        char_count = len(text) if text else 0  # 🔥 Количество символов
+# ✅ Записываем накопленную статистику: итоги владельцев и часовые срезы — в одной транзакции
+async def orm_flush_statistics(session: AsyncSession, totals: dict, buckets: dict):
+    if totals:
+        await session.execute(statistics_increment_stmt(totals))
+    if buckets:
+        await session.execute(statistics_buckets_increment_stmt(buckets))
+    await session.commit()
 
-        if stat:
-            print(f"🔄 Обновляем статистику для user_id={user_id}")
-            stat.messages_sent += 1
-            stat.words_translated += word_count
-            stat.characters_translated += char_count
-        else:
-            print(f"🆕 Создаём статистику для user_id={user_id}")
-            stat = Statistics(
-                user_id=user_id,
-                messages_sent=1,
-                words_translated=word_count,
-                characters_translated=char_count
+
+# ✅ Срезы статистики владельца за период, сгруппированные по "language", "chat_id" или "day"
+async def orm_get_statistics_rollup(session: AsyncSession, user_id: int, since: datetime, group_by: str = "language"):
+    if group_by == "day":
+        group_column = func.date_trunc("day", func.timezone("UTC", StatisticsBucket.bucket_start))
+    else:
+        group_column = getattr(StatisticsBucket, group_by)
+
+    billed_characters = func.sum(StatisticsBucket.billed_characters)
+    result = await session.execute(
+        select(
+            group_column,
+            func.sum(StatisticsBucket.messages),
+            func.sum(StatisticsBucket.words),
+            func.sum(StatisticsBucket.characters),
+            billed_characters,
+        )
+        .where(StatisticsBucket.user_id == user_id, StatisticsBucket.bucket_start >= since)
+        .group_by(group_column)
+        .order_by(group_column if group_by == "day" else billed_characters.desc())
+    )
+    return [
+        {"key": key, "messages": int(messages), "words": int(words), "characters": int(characters), "billed_characters": int(billed)}
+        for key, messages, words, characters, billed in result.all()
+    ]
+
+
+# ✅ Сворачиваем старые часовые срезы в дневные и удаляем совсем старые дневные
+async def orm_compact_statistics_buckets(session: AsyncSession, hourly_retention_days: int, daily_retention_days: int):
+    now = datetime.now(timezone.utc)
+    # Граница по началу суток (UTC): день сворачивается целиком
+    hourly_cutoff = (now - timedelta(days=hourly_retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # Перенос в одном запросе: удалённые часы сразу складываются в дни, ничего не теряется и не считается дважды
+    result = await session.execute(text("""
+        WITH moved AS (
+            DELETE FROM statistics_buckets
+            WHERE granularity = 'hour' AND bucket_start < :cutoff
+            RETURNING user_id, chat_id, language, bucket_start, messages, words, characters, billed_characters
+        ), rolled AS (
+            INSERT INTO statistics_buckets (user_id, chat_id, language, granularity, bucket_start, messages, words, characters, billed_characters)
+            SELECT user_id, chat_id, language, 'day', date_trunc('day', bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                   SUM(messages), SUM(words), SUM(characters), SUM(billed_characters)
+            FROM moved
+            GROUP BY 1, 2, 3, 5
+            ON CONFLICT (user_id, chat_id, language, granularity, bucket_start) DO UPDATE SET
+                messages = statistics_buckets.messages + EXCLUDED.messages,
+                words = statistics_buckets.words + EXCLUDED.words,
+                characters = statistics_buckets.characters + EXCLUDED.characters,
+                billed_characters = statistics_buckets.billed_characters + EXCLUDED.billed_characters,
+                updated_at = now()
+            RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM moved), (SELECT COUNT(*) FROM rolled)
+    """), {"cutoff": hourly_cutoff})
+    compacted, daily = result.one()
+
+    removed = 0
+    if daily_retention_days > 0:
+        result = await session.execute(
+            delete(StatisticsBucket).where(
+                StatisticsBucket.granularity == "day",
+                StatisticsBucket.bucket_start < now - timedelta(days=daily_retention_days)
             )
-            session.add(stat)
+        )
+        removed = result.rowcount
 
-        await session.flush()  # Применяем изменения в сессии
-        await session.commit()  # ✅ Финальный коммит
+    await session.commit()
+    return compacted, daily, removed
 
-        print(f"✅ Статистика обновлена для user_id={user_id}")
 
-    except Exception as e:
-        print(f"❌ Ошибка при обновлении статистики: {e}")
-        traceback.print_exc()
-        await session.rollback()  # Откатываем изменения в случае ошибки
\ No newline at end of file
+###########     Память переводов      ###########
+
+# ✅ Получаем сохранённые переводы по хешам (и отмечаем их использование)
+async def orm_get_translations(session: AsyncSession, source_hashes: list, target_lang: str):
+    if not source_hashes:
+        return {}
+
+    result = await session.execute(
+        select(TranslationMemory.id, TranslationMemory.source_hash, TranslationMemory.translated_text).where(
+            TranslationMemory.source_hash.in_(source_hashes),
+            TranslationMemory.target_lang == target_lang
+        )
+    )
+    rows = result.all()
+
+    if rows:
+        await session.execute(
+            update(TranslationMemory)
+            .where(TranslationMemory.id.in_([row.id for row in rows]))
+            .values(hit_count=TranslationMemory.hit_count + 1, last_used_at=func.now())
+        )
+        await session.commit()
+
+    return {row.source_hash: row.translated_text for row in rows}
+
+
+# ✅ Сохраняем новые переводы (повторная запись того же хеша просто обновляет перевод)
+async def orm_save_translations(session: AsyncSession, items: list, target_lang: str):
+    """items — список (source_hash, source_text, translated_text)."""
+    if not items:
+        return
+
+    stmt = insert(TranslationMemory).values([
+        {
+            "source_hash": source_hash,
+            "source_text": source_text,
+            "target_lang": target_lang,
+            "translated_text": translated_text,
+            "hit_count": 0,
+        }
+        for source_hash, source_text, translated_text in items
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TranslationMemory.source_hash, TranslationMemory.target_lang],
+        set_={"translated_text": stmt.excluded.translated_text, "last_used_at": func.now()}
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+# ✅ Удаляем переводы, которые давно не использовались
+async def orm_prune_translation_memory(session: AsyncSession, max_age_days: int):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+    result = await session.execute(
+        delete(TranslationMemory).where(TranslationMemory.last_used_at < cutoff)
+    )
+    await session.commit()
+    return result.rowcount
@@ -1,13 +1,17 @@
+import html
 import os
+from datetime import datetime, timedelta, timezone
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy import select
-from database.models import Channel, Settings
-from database.queries import orm_add_channel, orm_delete_channel, orm_get_admins, orm_get_all_channels, orm_get_statistics, orm_get_user, orm_set_setting
+from database.models import Settings
+from database.queries import orm_add_channel, orm_delete_channel, orm_get_admins, orm_get_all_channels, orm_get_main_channel, orm_get_statistics, orm_get_statistics_rollup, orm_get_user, orm_set_main_channel, orm_set_setting
 from sqlalchemy.ext.asyncio import AsyncSession
+from services.routing import routing_table
+from services.stats_buffer import statistics_buffer
 from utils.utils import get_valid_file
 
 from keyboards.admin import get_admin_menu, get_back_button, get_settings_keyboard
@@ -15,6 +19,17 @@ from keyboards.admin import get_admin_menu, get_back_button, get_settings_keyboa
 
 router = Router()
 
+STATS_PERIOD_DAYS = 7  # ✅ За сколько дней показываем разбивку по языкам, каналам и дням
+STATS_TOP_CHANNELS = 10  # Сколько каналов показываем (по оплаченным символам)
+
+
+def format_rollup_rows(rows: list, label) -> str:
+    """Строки разбивки статистики: «метка — сообщений, символов, оплачено символов DeepL»."""
+    return "\n".join(
+        f"• {label(row['key'])}: {row['messages']} сообщ., {row['characters']} симв., 💶 {row['billed_characters']}"
+        for row in rows
+    )
+
 
 
 AUTO_TRANSLATE_STATE = False  # ✅ Глобальная переменная для автоперевода
@@ -116,40 +131,55 @@ async def admin_stats(callback: types.CallbackQuery, session: AsyncSession):
     user_id = callback.from_user.id  # ✅ Получаем user_id пользователя, который нажал кнопку
 
     # 🔥 Проверяем, есть ли у пользователя главный канал
-    main_channel_result = await session.execute(select(Settings.value).where(
-        Settings.user_id == user_id, Settings.key == "MAIN_CHANNEL_ID"
-    ))
-    main_channel_id = main_channel_result.scalar()
-
-    if main_channel_id:
-        # ✅ Если есть главный канал, получаем владельца
-        owner_result = await session.execute(select(Channel.user_id).where(Channel.chat_id == int(main_channel_id)))
-        owner_id = owner_result.scalar()
-        
-        if owner_id:
-            print(f"🔄 Получаем статистику владельца канала user_id={owner_id}")
-            stats_user_id = owner_id  # Используем владельца канала
-        else:
-            print(f"⚠ Главный канал найден, но владелец не определён, используем user_id={user_id}")
-            stats_user_id = user_id
-    else:
+    main_channel_id = await orm_get_main_channel(session, user_id)
+
+    if not main_channel_id:
         print(f"⚠ Главный канал не найден, используем user_id={user_id}")
-        stats_user_id = user_id  # Если нет канала, используем user_id пользователя
+
+    # ✅ Статистика копится у владельца главного канала, то есть у самого пользователя
+    stats_user_id = user_id
+
+    # ✅ Сначала записываем буфер, чтобы разбивка за период была свежей
+    await statistics_buffer.flush()
 
     # 🔥 Получаем статистику
     stats = await orm_get_statistics(session, stats_user_id)
 
+    # ✅ Добавляем то, что ещё не сброшено из буфера в БД
+    pending_messages, pending_words, pending_characters = statistics_buffer.pending(stats_user_id)
+    stats["translated_messages"] += pending_messages
+    stats["total_words"] += pending_words
+    stats["total_characters"] += pending_characters
+
     # ✅ Проверяем, если вся статистика == 0, показываем другое сообщение
     if stats.get("translated_messages", 0) == 0 and stats.get("total_words", 0) == 0 and stats.get("total_characters", 0) == 0:
         await callback.answer("⚠️ Статистика доступна только владельцу канала!", show_alert=True)
         return
 
+    # ✅ Разбивка за последние дни: по языкам, каналам и дням (из почасовых/дневных срезов)
+    since = datetime.now(timezone.utc) - timedelta(days=STATS_PERIOD_DAYS)
+    by_language = await orm_get_statistics_rollup(session, stats_user_id, since, "language")
+    by_channel = await orm_get_statistics_rollup(session, stats_user_id, since, "chat_id")
+    by_day = await orm_get_statistics_rollup(session, stats_user_id, since, "day")
+    channel_names = {channel.chat_id: channel.name for channel in await orm_get_all_channels(session, stats_user_id)}
+
+    period_text = ""
+    if by_language:
+        period_text = (
+            f"\n\n📅 <b>За {STATS_PERIOD_DAYS} дней</b> (💶 — символы, оплаченные в DeepL)\n\n"
+            f"🌍 <b>По языкам:</b>\n{format_rollup_rows(by_language, str)}\n\n"
+            f"📢 <b>По каналам:</b>\n"
+            f"{format_rollup_rows(by_channel[:STATS_TOP_CHANNELS], lambda chat_id: html.escape(str(channel_names.get(chat_id, chat_id))))}\n\n"
+            f"📈 <b>По дням:</b>\n{format_rollup_rows(by_day, lambda day: day.strftime('%d.%m'))}"
+        )
+
     # ✅ Вывод статистики владельца
     await callback.message.answer(
         f"📊 <b>Статистика</b>\n\n"
         f"📩 <b>Переведённых сообщений:</b> <b>{stats.get('translated_messages')}</b>\n"
         f"📝 <b>Общее количество слов:</b> <b>{stats.get('total_words')}</b>\n"
-        f"🔠 <b>Общее количество символов:</b> <b>{stats.get('total_characters')}</b>",
+        f"🔠 <b>Общее количество символов:</b> <b>{stats.get('total_characters')}</b>"
+        f"{period_text}",
         parse_mode="HTML",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="🔙 Назад", callback_data="settings")]
@@ -187,7 +217,8 @@ async def set_main_channel(callback: types.CallbackQuery, session: AsyncSession)
     new_main_channel_id = int(callback.data.split("_")[2])
 
     # ✅ Сохраняем новый главный канал в БД
-    await orm_set_setting(session, "MAIN_CHANNEL_ID", str(new_main_channel_id), user_id)
+    await orm_set_main_channel(session, user_id, new_main_channel_id)
+    routing_table.invalidate()  # ✅ Маршруты перечитаются при следующем посте
 
     # ✅ Получаем название канала
     channels = await orm_get_all_channels(session, user_id)  # <-- Учёт пользователя
@@ -287,6 +318,7 @@ async def get_channel_language(message: types.Message, state: FSMContext, sessio
     added = await orm_add_channel(session, user_id, chat_id, chat_title, language)
 
     if added:
+        routing_table.invalidate()
         await message.answer(f"<b>Канал: {chat_title}</b>\n\n ID: {chat_id}\n Язык: {language}\n\n ✅ Добавлен", reply_markup=get_admin_menu())
     else:
         await message.answer("❌ Этот канал уже есть в базе данных.", reply_markup=get_admin_menu())
@@ -305,7 +337,8 @@ async def admin_delete_channel(callback: types.CallbackQuery, session: AsyncSess
     channel_id = callback.data.split("_")[1]  # Получаем ID удаляемого канала
 
     # 🔥 Удаляем канал из БД
-    await orm_delete_channel(session, channel_id)
+    if await orm_delete_channel(session, channel_id, callback.from_user.id):
+        routing_table.invalidate()
 
     # 🔄 Перезапрашиваем список каналов после удаления
     channels = await orm_get_all_channels(session, callback.from_user.id)  
@@ -329,9 +362,10 @@ async def admin_delete_channel(callback: types.CallbackQuery, session: AsyncSess
 @router.callback_query(F.data.startswith("delete_"))
 async def confirm_delete_channel(callback: types.CallbackQuery, session: AsyncSession):
     chat_id = int(callback.data.split("_")[1])  # Получаем chat_id из callback_data
-    deleted = await orm_delete_channel(session, chat_id)  # Удаляем канал из БД
+    deleted = await orm_delete_channel(session, chat_id, callback.from_user.id)  # Удаляем канал пользователя из БД
 
     if deleted:
+        routing_table.invalidate()
         # ✅ Получаем обновлённый список каналов
         channels = await orm_get_all_channels(session)
 
@@ -363,10 +397,7 @@ async def admin_list_channels(callback: types.CallbackQuery, session: AsyncSessi
     user_id = callback.from_user.id  # ✅ Получаем user_id
 
     # ✅ Получаем ID главного канала
-    result = await session.execute(
-        select(Settings.value).where(Settings.user_id == user_id, Settings.key == "MAIN_CHANNEL_ID")
-    )
-    main_channel_id = result.scalar()
+    main_channel_id = await orm_get_main_channel(session, user_id)
 
     # ✅ Получаем список каналов пользователя
     channels = await orm_get_all_channels(session, user_id)
@@ -378,7 +409,7 @@ async def admin_list_channels(callback: types.CallbackQuery, session: AsyncSessi
     # ✅ Создаём список каналов с короной для главного канала и языком
     text = "📋 <b>Список ваших каналов:</b>\n\n"
     for channel in channels:
-        crown = "👑" if str(channel.chat_id) == main_channel_id else "▫️"
+        crown = "👑" if channel.chat_id == main_channel_id else "▫️"
         text += f"{crown} <b>{channel.name}</b> ({channel.language})\n"
 
     # ✅ Отправляем новый ответ с кнопкой "Назад"
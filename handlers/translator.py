@@ -1,33 +1,47 @@
-import asyncio
-from collections import defaultdict
+import html
+from collections import Counter, defaultdict
+from functools import partial
+from typing import NamedTuple, Optional
 from aiogram import Router
+from aiogram.enums import ContentType, PollType
 from aiogram.types import (
-    Message, InputMediaPhoto, InputMediaVideo, InputMediaDocument,
+    Message, InputMediaPhoto, InputMediaVideo, InputMediaDocument, InputMediaAudio,
     InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from database.queries import orm_get_all_channels, orm_get_setting, orm_update_statistics
-from services.translator import translate_text
-from database.models import Channel
+from services.translator import translate_texts, TranslationError, UnsupportedLanguageError
+from services.retry_queue import retry_queue
+from services.send_queue import send_queue
+from services.media_groups import media_groups
+from services.routing import routing_table
+from services.stats_buffer import statistics_buffer
+from config import TRANSLATE_CONCURRENCY
+from utils.utils import gather_limited
 
 router = Router()
 
-# Буфер для медиа-групп
-media_group_buffer = defaultdict(list)
-media_group_lock = defaultdict(asyncio.Lock)
+def get_markup_texts(reply_markup) -> list:
+    """Собирает тексты всех кнопок клавиатуры (по строкам, слева направо)."""
+    if isinstance(reply_markup, InlineKeyboardMarkup):
+        return [button.text for row in reply_markup.inline_keyboard for button in row if button.text]
+    if isinstance(reply_markup, ReplyKeyboardMarkup):
+        return [button.text for row in reply_markup.keyboard for button in row if button.text]
+    return []
+
 
-async def translate_reply_markup(reply_markup, target_lang):
-    """Переводит текст кнопок в inline-клавиатурах и обычных клавиатурах."""
+def build_translated_markup(reply_markup, translated_labels: list):
+    """Пересобирает клавиатуру с переведёнными текстами кнопок (в порядке get_markup_texts)."""
     if not reply_markup:
         return None
 
+    labels = iter(translated_labels)
+
     if isinstance(reply_markup, InlineKeyboardMarkup):
         new_inline_keyboard = []
         for row in reply_markup.inline_keyboard:
             new_row = []
             for button in row:
-                translated_text = await translate_text(button.text, target_lang) if button.text else None
+                translated_text = next(labels) if button.text else None
                 new_row.append(
                     InlineKeyboardButton(
                         text=translated_text,
@@ -41,180 +55,256 @@ async def translate_reply_markup(reply_markup, target_lang):
     elif isinstance(reply_markup, ReplyKeyboardMarkup):
         new_keyboard = []
         for row in reply_markup.keyboard:
-            new_row = [KeyboardButton(text=await translate_text(button.text, target_lang)) for button in row]
+            new_row = [KeyboardButton(text=next(labels) if button.text else button.text) for button in row]
             new_keyboard.append(new_row)
         return ReplyKeyboardMarkup(keyboard=new_keyboard, resize_keyboard=True)
 
     return reply_markup
 
-@router.channel_post()
-async def auto_translate(message: Message, session: AsyncSession):
-    """Обрабатывает сообщения из главного канала, переводит и отправляет в другие каналы пользователя."""
 
-    main_channel = await orm_get_setting(session, "MAIN_CHANNEL_ID")
-    main_channel_id = int(main_channel[0]) if main_channel and main_channel[0] else None
+async def translate_message_parts(text: str, reply_markup, target_lang: str, source_chat_id=None, usage: Counter = None):
+    """Переводит текст сообщения и все кнопки одним пакетным запросом. Возвращает (текст, клавиатура)."""
+    markup_texts = get_markup_texts(reply_markup)
+    segments = ([text] if text else []) + markup_texts
 
-    if not main_channel_id or main_channel_id != message.chat.id:
-        return
+    translations = await translate_texts(segments, target_lang, source_chat_id, usage)
+
+    translated_text = translations.pop(0) if text else None
+    translated_markup = build_translated_markup(reply_markup, translations) if reply_markup else None
+    return translated_text, translated_markup
 
-    owner_result = await session.execute(select(Channel.user_id).where(Channel.chat_id == main_channel_id).limit(1))
-    owner_id = owner_result.scalar()
 
-    if not owner_id:
-        print(f"❌ Ошибка: Не найден владелец для канала {main_channel_id} в базе данных!")
+async def translate_poll(poll, target_lang: str, source_chat_id=None, usage: Counter = None) -> tuple:
+    """Переводит вопрос и варианты опроса одним пакетным запросом. Возвращает (вопрос, варианты)."""
+    # Опросы — обычный текст, а переводчик работает с HTML
+    segments = [html.escape(poll.question)] + [html.escape(option.text) for option in poll.options]
+    translations = [html.unescape(text) for text in await translate_texts(segments, target_lang, source_chat_id, usage)]
+    return translations[0], translations[1:]
+
+# Текст сообщения с кнопками альбома (send_media_group не принимает reply_markup)
+ALBUM_MARKUP_TEXT = "👆"
+
+
+def build_album(messages: list, caption: str) -> list:
+    """Собирает альбом для send_media_group: подпись и parse_mode — у первого элемента."""
+    album = []
+    for msg in messages:
+        options = {"caption": caption, "parse_mode": "HTML"} if not album and caption else {}
+        if msg.photo:
+            album.append(InputMediaPhoto(media=msg.photo[-1].file_id, **options))
+        elif msg.video:
+            album.append(InputMediaVideo(media=msg.video.file_id, **options))
+        elif msg.document:
+            album.append(InputMediaDocument(media=msg.document.file_id, **options))
+        elif msg.audio:
+            album.append(InputMediaAudio(media=msg.audio.file_id, **options))
+    return album
+
+
+def enqueue_media_group(message: Message, album: list, channel, translated_markup):
+    """Ставит альбом для одного канала в очередь отправки: один вызов send_media_group (+ кнопки, если есть)."""
+    if not album:
         return
-    else:
-        print(f"✅ Найден владелец: user_id={owner_id}")
+    bot = message.bot
+    description = f"альбом {message.chat.id}/{message.message_id} → {channel.chat_id}"
+
+    # Альбом Telegram считает за столько сообщений, сколько в нём файлов
+    send_queue.enqueue(
+        channel.chat_id, description,
+        partial(bot.send_media_group, chat_id=channel.chat_id, media=album),
+        cost=len(album)
+    )
+    if translated_markup:
+        send_queue.enqueue(
+            channel.chat_id, f"{description} (кнопки)",
+            partial(bot.send_message, chat_id=channel.chat_id, text=ALBUM_MARKUP_TEXT, reply_markup=translated_markup)
+        )
+
+
+class TranslatedPost(NamedTuple):
+    """Переведённые части поста для одного языка."""
+
+    text: Optional[str]
+    markup: object
+    poll: Optional[tuple] = None  # (вопрос, варианты)
+    disable_web_page_preview: bool = False
+
+
+def copy_with_caption(message: Message, chat_id: int, post: TranslatedPost):
+    """Медиа с подписью: копия сообщения с переведённой подписью и кнопками — один вызов API."""
+    return partial(
+        message.bot.copy_message,
+        chat_id=chat_id,
+        from_chat_id=message.chat.id,
+        message_id=message.message_id,
+        caption=post.text,  # None — остаётся исходная подпись
+        parse_mode="HTML" if post.text else None,
+        reply_markup=post.markup
+    )
+
+
+def copy_as_is(message: Message, chat_id: int, post: TranslatedPost):
+    """Всё, в чём нечего переводить (стикеры, кружки, геопозиции, контакты, кубики...): копия с кнопками."""
+    return partial(
+        message.bot.copy_message,
+        chat_id=chat_id,
+        from_chat_id=message.chat.id,
+        message_id=message.message_id,
+        reply_markup=post.markup
+    )
+
+
+def send_text(message: Message, chat_id: int, post: TranslatedPost):
+    """Текст: copy_message не умеет менять текст сообщения, поэтому отправляем заново."""
+    if not post.text:
+        return None
+    return partial(
+        message.bot.send_message,
+        chat_id=chat_id,
+        text=post.text,
+        parse_mode="HTML",
+        reply_markup=post.markup,
+        disable_web_page_preview=post.disable_web_page_preview
+    )
+
+
+def send_translated_poll(message: Message, chat_id: int, post: TranslatedPost):
+    """Опрос: копия оставила бы вопрос и варианты на языке оригинала, поэтому создаём опрос заново."""
+    poll = message.poll
+    if not post.poll or (poll.type == PollType.QUIZ and poll.correct_option_id is None):
+        return copy_as_is(message, chat_id, post)  # Правильный ответ викторины боту неизвестен
+
+    question, options = post.poll
+    return partial(
+        message.bot.send_poll,
+        chat_id=chat_id,
+        question=question,
+        options=options,
+        is_anonymous=poll.is_anonymous,
+        type=poll.type,
+        allows_multiple_answers=poll.allows_multiple_answers,
+        correct_option_id=poll.correct_option_id,
+        explanation=poll.explanation,
+        reply_markup=post.markup
+    )
 
-    channels = await orm_get_all_channels(session, owner_id)
-    channels = [ch for ch in channels if ch.chat_id != main_channel_id]
 
-    if not channels:
+# ✅ Как переслать каждый тип сообщения (всё, чего нет в таблице, копируется как есть)
+SEND_BUILDERS = {
+    ContentType.TEXT: send_text,
+    ContentType.POLL: send_translated_poll,
+    ContentType.PHOTO: copy_with_caption,
+    ContentType.VIDEO: copy_with_caption,
+    ContentType.ANIMATION: copy_with_caption,
+    ContentType.DOCUMENT: copy_with_caption,
+    ContentType.AUDIO: copy_with_caption,
+    ContentType.VOICE: copy_with_caption,
+}
+
+
+def enqueue_message(message: Message, channel, post: TranslatedPost):
+    """Ставит переведённое сообщение для одного канала в очередь отправки."""
+    send = SEND_BUILDERS.get(message.content_type, copy_as_is)(message, channel.chat_id, post)
+    if send:
+        send_queue.enqueue(channel.chat_id, f"пост {message.chat.id}/{message.message_id} → {channel.chat_id}", send)
+
+
+def group_channels_by_language(channels: list) -> dict:
+    """Группирует каналы по языку, чтобы переводить каждый язык только один раз."""
+    channels_by_language = defaultdict(list)
+    for channel in channels:
+        channels_by_language[channel.language.upper()].append(channel)
+    return dict(channels_by_language)
+
+
+async def publish_language(
+    message: Message, messages, language: str, channels: list, owners_by_chat: dict,
+    text: str, reply_markup, disable_web_page_preview: bool
+):
+    """Переводит пост на один язык и ставит его в очередь отправки во все каналы этого языка.
+
+    Если перевод не удался, выбрасывает TranslationError — в каналы ничего не уходит.
+    Публикация учитывается в статистике по каналам и языку (с оплаченными символами DeepL).
+    """
+    usage = Counter()
+    translated_text, translated_markup = None, None
+    if text or reply_markup:
+        translated_text, translated_markup = await translate_message_parts(
+            text, reply_markup, language, message.chat.id, usage
+        )
+    translated_poll = await translate_poll(message.poll, language, message.chat.id, usage) if message.poll else None
+    post = TranslatedPost(translated_text, translated_markup, translated_poll, disable_web_page_preview)
+
+    # ✅ Отправку выполняют воркеры очереди — с лимитами Telegram и повтором при flood wait
+    album = build_album(messages, translated_text) if messages else None
+    for channel in channels:
+        if messages:
+            enqueue_media_group(message, album, channel, translated_markup)
+        else:
+            enqueue_message(message, channel, post)
+    print(f"📤 {language}: в очереди отправки {len(channels)} канал(ов), {send_queue.stats()}")
+
+    statistics_buffer.add_channels(
+        [(owner_id, channel.chat_id) for channel in channels for owner_id in owners_by_chat.get(channel.chat_id, ())],
+        language, text, usage["billed_characters"]
+    )
+
+
+@router.channel_post()
+async def auto_translate(message: Message, session: AsyncSession, album: list = None):
+    """Обрабатывает сообщения из главного канала, переводит и отправляет в другие каналы пользователя."""
+
+    # ✅ Альбом обрабатываем один раз: его целиком получает обработчик первой части
+    # (обычно альбом уже собран в ConcurrencyLimitMiddleware — до того, как занят слот)
+    messages = None
+    if message.media_group_id is not None:
+        messages = album or await media_groups.collect(message)
+        if not messages:
+            return
+        # Подпись и кнопки альбома могут быть у любой части
+        message = next((part for part in messages if part.caption or part.reply_markup), messages[0])
+
+    # ✅ Маршрут из кэша: посты не из главных каналов отсекаются без запросов к БД
+    routes = [route for route in await routing_table.resolve(message.chat.id, session) if route.targets]
+    if not routes:
         return
 
+    # Один канал может быть главным у нескольких владельцев — публикуем во все их каналы (без повторов)
+    channels = list(dict.fromkeys(target for route in routes for target in route.targets))
+    owners_by_chat = defaultdict(list)
+    for route in routes:
+        for target in route.targets:
+            owners_by_chat[target.chat_id].append(route.owner_id)
+
     print(f"📩 Получено сообщение: {message.text or message.caption or 'Медиафайл'}")
     print(f"📄 Entities: {message.entities}")
 
     text_with_html = message.html_text or message.caption or ""
     reply_markup = message.reply_markup
-    is_media_group = message.media_group_id is not None
-
-    translated_texts = {ch.chat_id: await translate_text(text_with_html, ch.language) for ch in channels} if text_with_html else {}
-    translated_markups = {ch.chat_id: await translate_reply_markup(reply_markup, ch.language) for ch in channels} if reply_markup else {}
-
     disable_web_page_preview = "http" in text_with_html or "https" in text_with_html
 
-    # ✅ Обновляем статистику перед отправкой сообщений
-    print(f"🔄 Обновляем статистику для user_id={owner_id}, текст: {text_with_html}")
-    await orm_update_statistics(session, owner_id, text_with_html)
-    print("✅ Статистика успешно обновлена!")
-
-    if is_media_group:
-        async with media_group_lock[message.media_group_id]:
-            media_group_buffer[message.media_group_id].append(message)
-
-            # Ожидание всех частей группы (1 секунда)
-            await asyncio.sleep(1)
-
-            # Сортируем сообщения по времени
-            messages = sorted(media_group_buffer.pop(message.media_group_id, []), key=lambda m: m.date)
-
-            for channel in channels:
-                first_message = messages[0]
-                remaining_messages = messages[1:]
-                translated_text = translated_texts.get(channel.chat_id, None)
-                translated_markup = translated_markups.get(channel.chat_id, None)
-
-                if first_message.photo:
-                    await message.bot.send_photo(
-                        chat_id=channel.chat_id,
-                        photo=first_message.photo[-1].file_id,
-                        caption=translated_text,
-                        parse_mode="HTML",
-                        reply_markup=translated_markup
-                    )
-                elif first_message.video:
-                    await message.bot.send_video(
-                        chat_id=channel.chat_id,
-                        video=first_message.video.file_id,
-                        caption=translated_text,
-                        parse_mode="HTML",
-                        reply_markup=translated_markup
-                    )
-                elif first_message.document:
-                    await message.bot.send_document(
-                        chat_id=channel.chat_id,
-                        document=first_message.document.file_id,
-                        caption=translated_text,
-                        parse_mode="HTML",
-                        reply_markup=translated_markup
-                    )
+    # ✅ Учитываем пост в статистике (в БД попадёт со следующим сбросом буфера)
+    for route in routes:
+        statistics_buffer.add(route.owner_id, text_with_html)
 
-                media_group = []
-                for msg in remaining_messages:
-                    if msg.photo:
-                        media_group.append(InputMediaPhoto(media=msg.photo[-1].file_id))
-                    elif msg.video:
-                        media_group.append(InputMediaVideo(media=msg.video.file_id))
-                    elif msg.document:
-                        media_group.append(InputMediaDocument(media=msg.document.file_id))
-
-                if media_group:
-                    await message.bot.send_media_group(
-                        chat_id=channel.chat_id,
-                        media=media_group
-                    )
-            return  
+    # ✅ Переводим один раз на каждый язык (текст и кнопки — одним запросом) и параллельно по языкам
+    channels_by_language = group_channels_by_language(channels)
+    jobs = {
+        language: partial(
+            publish_language, message, messages, language, language_channels, owners_by_chat,
+            text_with_html, reply_markup, disable_web_page_preview
+        )
+        for language, language_channels in channels_by_language.items()
+    }
+    results = await gather_limited(TRANSLATE_CONCURRENCY, *(job() for job in jobs.values()))
 
-    for channel in channels:
-        translated_text = translated_texts.get(channel.chat_id, None)
-        translated_markup = translated_markups.get(channel.chat_id, None)
-
-        if message.photo:
-            await message.bot.send_photo(
-                chat_id=channel.chat_id,
-                photo=message.photo[-1].file_id,
-                caption=translated_text,
-                parse_mode="HTML",
-                reply_markup=translated_markup
-            )
-        elif message.video:
-            await message.bot.send_video(
-                chat_id=channel.chat_id,
-                video=message.video.file_id,
-                caption=translated_text,
-                parse_mode="HTML",
-                reply_markup=translated_markup
-            )
-        elif message.document:
-            await message.bot.send_document(
-                chat_id=channel.chat_id,
-                document=message.document.file_id,
-                caption=translated_text,
-                parse_mode="HTML",
-                reply_markup=translated_markup
-            )
-        elif message.audio:
-            await message.bot.send_audio(
-                chat_id=channel.chat_id,
-                audio=message.audio.file_id,
-                caption=translated_text,
-                parse_mode="HTML",
-                reply_markup=translated_markup
-            )
-        elif message.voice:
-            await message.bot.send_voice(
-                chat_id=channel.chat_id,
-                voice=message.voice.file_id,
-                caption=translated_text,
-                parse_mode="HTML",
-                reply_markup=translated_markup
-            )
-        elif message.video_note:
-            await message.bot.send_video_note(
-                chat_id=channel.chat_id,
-                video_note=message.video_note.file_id
-            )
-        elif message.sticker:
-            await message.bot.send_sticker(
-                chat_id=channel.chat_id,
-                sticker=message.sticker.file_id
-            )
-        elif message.poll:
-            await message.bot.send_poll(
-                chat_id=channel.chat_id,
-                question=message.poll.question,
-                options=[option.text for option in message.poll.options],
-                is_anonymous=message.poll.is_anonymous,
-                allows_multiple_answers=message.poll.allows_multiple_answers
-            )
-        elif translated_text:
-            await message.bot.send_message(
-                chat_id=channel.chat_id,
-                text=translated_text,
-                parse_mode="HTML",
-                reply_markup=translated_markup,
-                disable_web_page_preview=disable_web_page_preview
-            )
-
-    print("✅ Сообщение переведено и отправлено в каналы!")
\ No newline at end of file
+    for (language, job), result in zip(jobs.items(), results):
+        if isinstance(result, UnsupportedLanguageError):
+            print(f"❌ Ошибка (перевод) для языка {language}: {result}")
+        elif isinstance(result, TranslationError):
+            # ❌ Перевод не удался — не публикуем мусор, а откладываем до восстановления бэкенда
+            retry_queue.park(f"пост {message.chat.id}/{message.message_id} → {language}", job)
+        elif isinstance(result, Exception):
+            print(f"❌ Ошибка публикации для языка {language}: {result}")
+
+    print("✅ Сообщение переведено и отправлено в каналы!")
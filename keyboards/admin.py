@@ -3,7 +3,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Settings
-from database.queries import orm_get_all_channels
+from database.queries import orm_get_all_channels, orm_get_main_channel
 
 
 # ✅ Клавиатура для регистрации
@@ -61,10 +61,7 @@ def get_admin_menu():
 # ✅ Клавиатура настроек
 async def get_settings_keyboard(session: AsyncSession, user_id: int):
     # ✅ Получаем ID главного канала
-    result = await session.execute(
-        select(Settings.value).where(Settings.user_id == user_id, Settings.key == "MAIN_CHANNEL_ID")
-    )
-    main_channel_id = result.scalar()
+    main_channel_id = await orm_get_main_channel(session, user_id)
 
     # ✅ Загружаем список каналов
     channels = await orm_get_all_channels(session, user_id)
@@ -72,7 +69,7 @@ async def get_settings_keyboard(session: AsyncSession, user_id: int):
     # ✅ Определяем название главного канала
     main_channel_name = "Не выбран"
     if main_channel_id:
-        main_channel = next((ch for ch in channels if str(ch.chat_id) == main_channel_id), None)
+        main_channel = next((ch for ch in channels if ch.chat_id == main_channel_id), None)
         if main_channel:
             main_channel_name = f"👑 {main_channel.name}"  # ✅ Добавляем значок короны
 
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from aiogram.dispatcher.middlewares.base import BaseMiddleware
+
+
+# Middleware, ограничивающий число одновременно обрабатываемых апдейтов (и в polling, и в webhook)
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Части альбома собираются через `media_groups` ДО того, как занять слот: иначе при занятых
+    слотах остальные части ждали бы семафор, пока первая часть ждёт их в сборщике, и альбом уходил
+    бы неполным. Обработчик первой части получает весь альбом в `album`, остальные части не обрабатываются.
+    """
+
+    def __init__(self, limit: int = 50, media_groups=None):
+        self.limit = limit
+        self.media_groups = media_groups
+        self.pending = 0  # Принятые, но ещё не обработанные апдейты (включая ждущих своей очереди)
+        self.in_flight = 0
+        self.handled = 0
+        self._semaphore = None
+
+    async def __call__(self, handler, event, data):
+        if self._semaphore is None and self.limit > 0:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        self.pending += 1
+        try:
+            post = getattr(event, "channel_post", None)
+            if self.media_groups is not None and post is not None and post.media_group_id is not None:
+                album = await self.media_groups.collect(post)
+                if not album:
+                    return None  # Эта часть уже в альбоме, который опубликует обработчик первой части
+                data["album"] = album
+
+            if self._semaphore is None:
+                return await self._handle(handler, event, data)
+            async with self._semaphore:
+                return await self._handle(handler, event, data)
+        finally:
+            self.pending -= 1
+
+    async def _handle(self, handler, event, data):
+        self.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            self.handled += 1
+
+    async def wait_idle(self, timeout: float):
+        """Ждёт, пока обработаются уже принятые апдейты (не дольше `timeout` секунд)."""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.pending:
+            print(f"⚠ Остановка: не дождались {self.pending} апдейтов")
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "pending": self.pending, "in_flight": self.in_flight, "handled": self.handled}
@@ -0,0 +1,632 @@
+import aiohttp
+import asyncio
+import importlib
+import os
+import random
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Protocol
+from urllib.parse import quote_plus
+from services.rate_limit import TokenBucket
+
+# Языки, которые бот предлагает при добавлении канала (запасной список, если API недоступно)
+DEFAULT_LANGUAGES = {"EN", "DE", "FR", "ES", "RU", "IT", "NL", "PL", "PT", "JA", "ZH"}
+
+# ✅ Эндпоинты DeepL
+DEEPL_FREE_URL = "https://api-free.deepl.com/v2/translate"
+DEEPL_PRO_URL = "https://api.deepl.com/v2/translate"
+
+# ✅ Лимиты DeepL на один запрос
+DEEPL_MAX_TEXTS_PER_REQUEST = 50  # Не больше 50 полей `text`
+DEEPL_MAX_REQUEST_BYTES = 120 * 1024  # Тело запроса до 128 KiB (оставляем запас на остальные поля)
+
+# Если /v2/languages недоступен, список по умолчанию используется столько секунд до следующей попытки
+LANGUAGES_RETRY_SECONDS = 60
+LANGUAGES_REQUEST_TIMEOUT = 5  # /v2/languages не должен держать пост дольше обычного запроса
+
+# HTTP-статусы DeepL, при которых имеет смысл повторить запрос
+DEEPL_RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+DEEPL_QUOTA_EXCEEDED_STATUS = 456
+
+
+class TranslationError(Exception):
+    """Перевод не удался — такой текст нельзя публиковать в каналы."""
+
+
+class UnsupportedLanguageError(TranslationError):
+    """Бэкенд не поддерживает целевой язык — повторять бессмысленно."""
+
+
+class QuotaExceededError(TranslationError):
+    """Исчерпана квота символов (локальная или на стороне API)."""
+
+
+class TranslatedText(str):
+    """Перевод вместе с языком оригинала, который определил бэкенд (если он его сообщает).
+
+    `cache_options` — параметры движка, который на самом деле сделал перевод (если это
+    не тот движок, что указан в cache_options() бэкенда до вызова, например запасной).
+    """
+
+    def __new__(cls, text: str, detected_source_language: str = None, cache_options: tuple = None):
+        translated = super().__new__(cls, text)
+        translated.detected_source_language = detected_source_language
+        translated.cache_options = cache_options
+        return translated
+
+
+class TranslationBackend(Protocol):
+    """Интерфейс бэкенда перевода, с которым работает services/translator.py."""
+
+    name: str
+
+    def split_batches(self, texts: list) -> list:
+        """Делит тексты на пачки, каждая из которых укладывается в один запрос."""
+
+    def cache_options(self, target_lang: str) -> tuple:
+        """Параметры, влияющие на результат перевода (входят в ключ кэша)."""
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        """Переводит одну пачку текстов (`source_lang` — подсказка, None — автоопределение).
+
+        Может вернуть TranslatedText с языком оригинала и движком, сделавшим перевод.
+        При ошибке выбрасывает TranslationError.
+        """
+
+    async def usage(self) -> dict:
+        """Использование квоты: {"character_count": ..., "character_limit": ...}."""
+
+    async def supported_languages(self) -> set:
+        """Коды поддерживаемых целевых языков (в верхнем регистре)."""
+
+    async def refresh_usage(self):
+        """Синхронизирует локальный счётчик квоты с бэкендом (если у бэкенда есть квота)."""
+
+    async def close(self):
+        """Освобождает ресурсы бэкенда."""
+
+
+class CharacterQuota:
+    """Локальный счётчик квоты символов: позволяет отказать заранее, не дожидаясь 456 от DeepL.
+
+    Исчерпанная квота не вечна: не чаще, чем раз в `recheck_interval` секунд, бэкенд
+    перечитывает /v2/usage (`needs_recheck`), и `update` снимает флаг, если символы снова есть.
+    """
+
+    def __init__(self, limit: int = 0, used: int = 0, recheck_interval: float = 300):
+        self.limit = limit  # 0 — без ограничения
+        self.used = used
+        self.recheck_interval = recheck_interval
+        self.exhausted = False
+        self.checked_at = time.monotonic()
+
+    @property
+    def remaining(self):
+        return max(0, self.limit - self.used) if self.limit else None
+
+    def mark_exhausted(self):
+        self.exhausted = True
+        self.checked_at = time.monotonic()
+
+    def needs_recheck(self) -> bool:
+        """Квота упёрлась в лимит, и пора узнать у API, не обновилась ли она."""
+        blocked = self.exhausted or (self.limit and self.used >= self.limit)
+        return bool(blocked) and time.monotonic() - self.checked_at >= self.recheck_interval
+
+    def update(self, used: int, limit: int = None):
+        """Данные из /v2/usage: если символы снова есть, снимаем флаг исчерпания."""
+        self.used = used
+        if limit is not None:
+            self.limit = limit
+        self.checked_at = time.monotonic()
+        if not self.limit or self.used < self.limit:
+            self.exhausted = False
+
+    def check(self, characters: int):
+        if self.exhausted or (self.limit and self.used + characters > self.limit):
+            if not self.exhausted:
+                self.mark_exhausted()
+            raise QuotaExceededError(f"Квота исчерпана: {self.used}/{self.limit} символов")
+
+    def consume(self, characters: int):
+        self.used += characters
+
+
+def prepare_text_for_translation(text):
+    """Заменяем переводы строк на <br>, чтобы DeepL сохранял форматирование."""
+    text = text.replace("\n", "<br>")  # Telegram использует \n, а DeepL лучше работает с <br>
+    return text
+
+
+def restore_line_breaks(text):
+    """Восстанавливает отступы и абзацы в переведенном тексте."""
+    text = re.sub(r'\s*<br\s*/?>\s*', '\n', text)  # Заменяем <br> на \n
+    text = re.sub(r'\s*</?(p|div)>\s*', '\n\n', text)  # <p> и <div> превращаем в абзацы
+    text = re.sub(r'\n{3,}', '\n\n', text)  # Убираем лишние пустые строки
+    return text.strip()
+
+
+class DeepLBackend:
+    """Бэкенд DeepL: одна aiohttp-сессия с пулом соединений на весь процесс.
+
+    Запросы проходят через token bucket (запросы/сек и символы/сек) и повторяются
+    с экспоненциальной паузой и джиттером при 429/5xx, учитывая Retry-After.
+    Повтор, который не успеет завершиться до `deadline`, не начинается — сразу ошибка.
+    """
+
+    name = "deepl"
+    default_url = DEEPL_FREE_URL
+
+    def __init__(
+        self,
+        api_key: str = None,
+        url: str = None,
+        max_connections: int = 20,
+        max_connections_per_host: int = 10,
+        keepalive_timeout: float = 60,
+        dns_cache_ttl: int = 300,
+        connect_timeout: float = 5,
+        read_timeout: float = 10,
+        total_timeout: float = 10,
+        max_requests_per_second: float = 5,
+        max_characters_per_second: float = 20000,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 5,
+        character_quota: int = 0,
+        quota_recheck_interval: float = 300,
+        deadline: float = 0,
+    ):
+        self.api_key = api_key
+        self.url = url or self.default_url
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout,
+            sock_connect=connect_timeout,
+            sock_read=read_timeout,
+        )
+        self.request_bucket = TokenBucket(max_requests_per_second)
+        self.character_bucket = TokenBucket(max_characters_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline  # Предел на запрос вместе с повторами (0 — без предела)
+        self.quota = CharacterQuota(character_quota, recheck_interval=quota_recheck_interval)
+        self.fixed_quota_limit = bool(character_quota)  # Локальный лимит из конфига не перезаписываем
+        self._languages: Optional[set] = None
+        self._languages_expires_at = 0.0  # До этого момента не перезапрашиваем /v2/languages
+        self._languages_lock: Optional[asyncio.Lock] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def api_base(self) -> str:
+        """Базовый адрес API (`.../v2`), от него строятся /usage и /languages."""
+        return self.url.rsplit("/", 1)[0]
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая её при первом обращении."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"Authorization": f"DeepL-Auth-Key {self.api_key}"},
+            )
+        return self._session
+
+    async def close(self):
+        """Закрывает сессию и все соединения пула."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def request_params(self, target_lang: str) -> list:
+        """Общие параметры запроса DeepL (без полей `text`)."""
+        return [
+            ("target_lang", target_lang.upper()),
+            ("tag_handling", "html"),  # Сообщаем DeepL, что текст содержит HTML
+            ("ignore_tags", "b, i, u, s, code, pre, a"),  # Теги, которые НЕ нужно переводить
+            ("preserve_formatting", "1"),  # Сохраняем пробелы и отступы
+            ("split_sentences", "nonewlines"),  # Не разбиваем текст на новые строки
+            ("formality", "default"),
+        ]
+
+    def cache_options(self, target_lang: str) -> tuple:
+        return tuple(self.request_params(target_lang))
+
+    def split_batches(self, texts: list) -> list:
+        """Делит тексты на пачки, укладывающиеся в лимиты DeepL по количеству и размеру запроса."""
+        batches = []
+        batch, batch_size = [], 0
+
+        for text in texts:
+            # Размер поля в url-encoded теле (после замены \n на <br>)
+            text_size = len(quote_plus(prepare_text_for_translation(text))) + len("&text=")
+            if batch and (len(batch) >= DEEPL_MAX_TEXTS_PER_REQUEST or batch_size + text_size > DEEPL_MAX_REQUEST_BYTES):
+                batches.append(batch)
+                batch, batch_size = [], 0
+            batch.append(text)
+            batch_size += text_size
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def post(self, data) -> tuple:
+        """Отправляет форму в DeepL и возвращает (HTTP-статус, JSON-ответ, заголовки)."""
+        async with self.session.post(self.url, data=data) as response:
+            result = await response.json(content_type=None)
+            return response.status, result, response.headers
+
+    async def usage(self) -> dict:
+        """Запрашивает /v2/usage."""
+        async with self.session.get(f"{self.api_base}/usage") as response:
+            result = await response.json(content_type=None)
+            if response.status != 200:
+                raise TranslationError(f"DeepL /usage вернул {response.status}: {result}")
+            return result
+
+    async def refresh_usage(self):
+        """Подтягивает использованные символы и лимит из /v2/usage в локальный счётчик квоты."""
+        self.quota.checked_at = time.monotonic()  # Одновременные запросы не дёргают /usage повторно
+        try:
+            result = await self.usage()
+            self.quota.update(
+                result.get("character_count", self.quota.used),
+                None if self.fixed_quota_limit else result.get("character_limit", 0),
+            )
+            print(f"📊 Квота DeepL: {self.quota.used}/{self.quota.limit} символов{' (исчерпана)' if self.quota.exhausted else ''}")
+        except Exception as e:
+            print(f"⚠ Не удалось получить квоту DeepL: {e}")
+
+    async def supported_languages(self) -> set:
+        """Целевые языки из /v2/languages (с базовыми кодами: EN-GB → EN). Результат кэшируется.
+
+        Если API недоступно, на `LANGUAGES_RETRY_SECONDS` запоминается список по умолчанию —
+        посты не ждут таймаута /v2/languages каждый раз.
+        """
+        if self._languages is not None and time.monotonic() < self._languages_expires_at:
+            return self._languages
+
+        if self._languages_lock is None:
+            self._languages_lock = asyncio.Lock()
+        async with self._languages_lock:
+            if self._languages is not None and time.monotonic() < self._languages_expires_at:
+                return self._languages  # Пока ждали, список получил другой пост
+            try:
+                async with self.session.get(
+                    f"{self.api_base}/languages",
+                    params={"type": "target"},
+                    timeout=aiohttp.ClientTimeout(total=LANGUAGES_REQUEST_TIMEOUT),
+                ) as response:
+                    result = await response.json(content_type=None)
+                if response.status != 200:
+                    raise TranslationError(f"DeepL /languages вернул {response.status}: {result}")
+                codes = {item["language"].upper() for item in result}
+                self._languages = codes | {code.split("-")[0] for code in codes}
+                self._languages_expires_at = float("inf")
+            except Exception as e:
+                print(f"⚠ Не удалось получить языки DeepL, {LANGUAGES_RETRY_SECONDS} сек используем список по умолчанию: {e}")
+                self._languages = DEFAULT_LANGUAGES
+                self._languages_expires_at = time.monotonic() + LANGUAGES_RETRY_SECONDS
+        return self._languages
+
+    def backoff_delay(self, attempt: int, retry_after: str = None) -> float:
+        """Экспоненциальная пауза с джиттером (не больше backoff_max); Retry-After от сервера не урезается."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt * random.uniform(0.5, 1.5))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def request(self, data, characters: int) -> dict:
+        """Отправляет запрос перевода с учётом лимитов, квоты и повторов. Возвращает JSON-ответ DeepL."""
+        if self.quota.needs_recheck():
+            await self.refresh_usage()  # Квоту могли обновить (новый расчётный период)
+        self.quota.check(characters)
+
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire(1)
+            await self.character_bucket.acquire(characters)
+
+            retry_after = None
+            try:
+                status, result, headers = await self.post(data)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, result = None, str(e) or type(e).__name__
+            else:
+                if status == 200:
+                    self.quota.consume(characters)
+                    return result
+                if status == DEEPL_QUOTA_EXCEEDED_STATUS:
+                    self.quota.mark_exhausted()
+                    raise QuotaExceededError(f"DeepL вернул 456: {result}")
+                if status not in DEEPL_RETRY_STATUSES:
+                    raise TranslationError(f"DeepL вернул {status}: {result}")
+                retry_after = headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                break
+            delay = self.backoff_delay(attempt, retry_after)
+            if delay > self.backoff_max:
+                # Повтор раньше Retry-After снова получит отказ — лучше сразу вернуть ошибку
+                raise TranslationError(f"DeepL просит подождать {delay:.0f} сек (больше {self.backoff_max} сек): {status} {result}")
+            if self.deadline and time.monotonic() - started + delay + (self.timeout.total or 0) > self.deadline:
+                # Вызов всё равно отменят по дедлайну — не тратим лимиты на повтор
+                raise TranslationError(f"DeepL: повтор не успеет до дедлайна {self.deadline} сек: {status} {result}")
+            print(f"⏳ DeepL: {status or 'ошибка сети'} ({result}), повтор {attempt + 1}/{self.max_retries} через {delay:.1f} сек")
+            await asyncio.sleep(delay)
+
+        raise TranslationError(f"DeepL недоступен после {self.max_retries + 1} попыток: {status} {result}")
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        """Переводит одну пачку текстов одним запросом, сохраняя HTML-разметку и отступы."""
+        prepared_texts = [prepare_text_for_translation(text) for text in texts]  # Заменяем \n на <br>
+        data = [("text", text) for text in prepared_texts] + self.request_params(target_lang)
+        if source_lang:
+            data.append(("source_lang", source_lang.upper()))  # Без этого DeepL определяет язык сам
+
+        result = await self.request(data, sum(len(text) for text in prepared_texts))
+        translations = result.get("translations", [])
+        if len(translations) != len(texts):
+            raise TranslationError(f"DeepL вернул {len(translations)} переводов вместо {len(texts)}")
+        return [
+            TranslatedText(restore_line_breaks(item["text"]), item.get("detected_source_language"))  # Восстанавливаем отступы
+            for item in translations
+        ]
+
+
+class DeepLFreeBackend(DeepLBackend):
+    """DeepL API Free (api-free.deepl.com)."""
+
+    name = "deepl-free"
+    default_url = DEEPL_FREE_URL
+
+
+class DeepLProBackend(DeepLBackend):
+    """DeepL API Pro (api.deepl.com)."""
+
+    name = "deepl-pro"
+    default_url = DEEPL_PRO_URL
+
+
+# ✅ Локальный движок перевода внутри процесса-воркера (загружается один раз на процесс)
+_worker_engine = None
+
+
+def load_engine(engine_spec: str):
+    """Создаёт движок по строке вида `package.module:factory`."""
+    module_name, _, factory_name = engine_spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), factory_name or "create_engine")
+    return factory()
+
+
+def _init_worker(engine_spec: str):
+    """Инициализатор процесса пула: загружает модель заранее, чтобы первый запрос не ждал."""
+    global _worker_engine
+    _worker_engine = load_engine(engine_spec)
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+def _worker_languages() -> set:
+    return {code.upper() for code in getattr(_worker_engine, "supported_languages", DEFAULT_LANGUAGES)}
+
+
+def _worker_translate(texts: list, target_lang: str) -> list:
+    return list(_worker_engine.translate(texts, target_lang))
+
+
+class ProcessPoolBackend:
+    """Бэкенд для локальных CPU-движков перевода: считает в отдельных процессах, не блокируя event loop.
+
+    Каждый язык закреплён за одним процессом (модель языка живёт в памяти только там),
+    а одновременные запросы одного языка склеиваются в одну пачку за `batch_window` секунд.
+    """
+
+    name = "local"
+
+    def __init__(self, engine: str, workers: int = None, batch_window: float = 0.02, max_batch_size: int = 64):
+        if not engine:
+            raise ValueError("Не задан локальный движок перевода (LOCAL_TRANSLATOR_ENGINE=модуль:фабрика)")
+        self.engine = engine
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._executors = []
+        self._pending = {}  # язык -> [(тексты, future)]
+        self._flushers = {}  # язык -> задача сброса пачки
+        self._languages: Optional[set] = None
+        self.batches = 0
+        self.texts = 0
+
+    def _executor_for(self, target_lang: str) -> ProcessPoolExecutor:
+        """Стабильно закрепляет язык за процессом (одинаково между перезапусками)."""
+        if not self._executors:
+            self._executors = [
+                ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.engine,))
+                for _ in range(self.workers)
+            ]
+        return self._executors[zlib.crc32(target_lang.upper().encode()) % len(self._executors)]
+
+    async def warm_up(self):
+        """Запускает все процессы и загружает в них модель до первого поста."""
+        loop = asyncio.get_running_loop()
+        self._executor_for("")
+        pids = await asyncio.gather(*(loop.run_in_executor(executor, _worker_ping) for executor in self._executors))
+        print(f"🔥 Локальный переводчик {self.engine}: прогреты процессы {pids}")
+
+    def split_batches(self, texts: list) -> list:
+        return [texts[i:i + self.max_batch_size] for i in range(0, len(texts), self.max_batch_size)]
+
+    def cache_options(self, target_lang: str) -> tuple:
+        return (("engine", self.engine), ("target_lang", target_lang.upper()))
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        """Ставит тексты в пачку своего языка и ждёт результат (язык оригинала движок определяет сам)."""
+        target_lang = target_lang.upper()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(target_lang, []).append((texts, future))
+
+        pending_size = sum(len(item[0]) for item in self._pending[target_lang])
+        if pending_size >= self.max_batch_size:
+            self._flush(target_lang)
+        elif target_lang not in self._flushers:
+            self._flushers[target_lang] = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush, target_lang
+            )
+        return await future
+
+    def _flush(self, target_lang: str):
+        handle = self._flushers.pop(target_lang, None)
+        if handle is not None:
+            handle.cancel()
+        items = self._pending.pop(target_lang, [])
+        if items:
+            asyncio.ensure_future(self._run_batch(target_lang, items))
+
+    async def _run_batch(self, target_lang: str, items: list):
+        texts = [text for item_texts, _ in items for text in item_texts]
+        self.batches += 1
+        self.texts += len(texts)
+
+        try:
+            loop = asyncio.get_running_loop()
+            translations = await loop.run_in_executor(
+                self._executor_for(target_lang), _worker_translate, texts, target_lang
+            )
+            if len(translations) != len(texts):
+                raise TranslationError(f"Локальный движок вернул {len(translations)} переводов вместо {len(texts)}")
+        except Exception as e:
+            error = e if isinstance(e, TranslationError) else TranslationError(f"Ошибка локального движка: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        position = 0
+        for item_texts, future in items:
+            if not future.done():
+                future.set_result(translations[position:position + len(item_texts)])
+            position += len(item_texts)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "batches": self.batches, "texts": self.texts}
+
+    async def usage(self) -> dict:
+        return {"character_count": 0, "character_limit": 0}
+
+    async def supported_languages(self) -> set:
+        if self._languages is None:
+            # Спрашиваем у воркера, чтобы не загружать модель в основной процесс
+            loop = asyncio.get_running_loop()
+            self._languages = await loop.run_in_executor(self._executor_for(""), _worker_languages)
+        return self._languages
+
+    async def refresh_usage(self):
+        await self.warm_up()
+
+    async def close(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = []
+
+
+class FallbackBackend:
+    """Переключается на запасной бэкенд, когда у основного кончилась квота.
+
+    Каждый перевод помечен параметрами движка, который его сделал (TranslatedText.cache_options),
+    поэтому переводы запасного движка кэшируются отдельно, даже если квота кончилась посреди вызова.
+    """
+
+    def __init__(self, primary: TranslationBackend, fallback: TranslationBackend):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+        self.degraded = False  # Квота основного бэкенда кончилась
+        self.fallback_calls = 0
+
+    def split_batches(self, texts: list) -> list:
+        return self.primary.split_batches(texts)
+
+    def cache_options(self, target_lang: str) -> tuple:
+        # Переводы запасного движка кэшируются отдельно и не выдаются за переводы основного
+        backend = self.fallback if self.degraded else self.primary
+        return backend.cache_options(target_lang)
+
+    @staticmethod
+    def _tag(translations: list, backend: TranslationBackend, target_lang: str) -> list:
+        options = backend.cache_options(target_lang)
+        return [
+            TranslatedText(text, getattr(text, "detected_source_language", None), options)
+            for text in translations
+        ]
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        try:
+            translations = await self.primary.translate_batch(texts, target_lang, source_lang)
+        except QuotaExceededError as e:
+            self.degraded = True
+            self.fallback_calls += 1
+            print(f"🔁 {e} — переводим через {self.fallback.name}")
+            translations = await self.fallback.translate_batch(texts, target_lang, source_lang)
+            return self._tag(translations, self.fallback, target_lang)
+
+        if self.degraded:
+            self.degraded = False  # Квота основного бэкенда снова есть
+            print(f"✅ {self.primary.name} снова переводит")
+        return self._tag(translations, self.primary, target_lang)
+
+    def stats(self) -> dict:
+        inner = self.primary.stats() if hasattr(self.primary, "stats") else {}
+        return {**inner, "fallback_calls": self.fallback_calls}
+
+    async def usage(self) -> dict:
+        return await self.primary.usage()
+
+    async def supported_languages(self) -> set:
+        return await self.primary.supported_languages()
+
+    async def refresh_usage(self):
+        await self.primary.refresh_usage()
+        await self.fallback.refresh_usage()
+
+    async def close(self):
+        await self.primary.close()
+        await self.fallback.close()
+
+
+BACKENDS = {
+    DeepLFreeBackend.name: DeepLFreeBackend,
+    DeepLProBackend.name: DeepLProBackend,
+    ProcessPoolBackend.name: ProcessPoolBackend,
+}
+
+
+def create_backend(name: str = "auto", **options) -> TranslationBackend:
+    """Создаёт бэкенд по имени из конфига. `auto` выбирает Free или Pro по ключу (ключи Free оканчиваются на `:fx`)."""
+    name = (name or "auto").lower()
+    if name == "auto":
+        api_key = options.get("api_key") or ""
+        name = DeepLProBackend.name if api_key and not api_key.endswith(":fx") else DeepLFreeBackend.name
+
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд перевода: {name} (доступны: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**options)
@@ -0,0 +1,134 @@
+import time
+from services.backends import TranslationBackend, TranslationError, QuotaExceededError
+
+
+class CircuitOpenError(TranslationError):
+    """Цепь разомкнута: бэкенд считается недоступным, вызов отклонён сразу."""
+
+
+class CircuitBreaker:
+    """Circuit breaker: после серии ошибок или медленных вызовов быстро отказывает, пока бэкенд не восстановится.
+
+    closed → (failure_threshold сбоев подряд) → open → (open_seconds) → half_open → успех → closed
+                                                                               → сбой  → open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, slow_call_seconds: float = 10, open_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    @property
+    def available(self) -> bool:
+        """Можно ли сейчас отправить запрос (закрыта цепь или пора делать пробный вызов)."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.open_seconds
+        if self.state == self.HALF_OPEN:
+            return not self.probe_in_flight
+        return True
+
+    def before_call(self):
+        """Проверяет, можно ли вызывать бэкенд. Иначе выбрасывает CircuitOpenError."""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+            print("🟡 Circuit breaker: пробный вызов бэкенда")
+
+        if self.state == self.OPEN or (self.state == self.HALF_OPEN and self.probe_in_flight):
+            self.rejected_calls += 1
+            raise CircuitOpenError("Бэкенд перевода временно недоступен (circuit breaker разомкнут)")
+
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = True
+
+    def record_success(self, duration: float):
+        if duration >= self.slow_call_seconds:
+            print(f"🐢 Circuit breaker: медленный ответ бэкенда ({duration:.1f} сек)")
+            self.record_failure()
+            return
+        if self.state != self.CLOSED:
+            print("🟢 Circuit breaker: бэкенд восстановился")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                print(f"🔴 Circuit breaker: цепь разомкнута на {self.open_seconds:.0f} сек")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected_calls": self.rejected_calls,
+            "times_opened": self.times_opened,
+        }
+
+
+class CircuitBreakerBackend:
+    """Обёртка над любым бэкендом перевода, пропускающая вызовы через CircuitBreaker."""
+
+    def __init__(self, backend: TranslationBackend, breaker: CircuitBreaker):
+        self.backend = backend
+        self.breaker = breaker
+        self.name = backend.name
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.available
+
+    def split_batches(self, texts: list) -> list:
+        return self.backend.split_batches(texts)
+
+    def cache_options(self, target_lang: str) -> tuple:
+        return self.backend.cache_options(target_lang)
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        self.breaker.before_call()
+        started_at = time.monotonic()
+        try:
+            result = await self.backend.translate_batch(texts, target_lang, source_lang)
+        except QuotaExceededError:
+            # Кончилась квота — это не сбой бэкенда, цепь не размыкаем
+            self.breaker.probe_in_flight = False
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.probe_in_flight = False  # Вызов отменён — пробный слот освобождаем
+            raise
+        self.breaker.record_success(time.monotonic() - started_at)
+        return result
+
+    def stats(self) -> dict:
+        inner = self.backend.stats() if hasattr(self.backend, "stats") else {}
+        return {"circuit": self.breaker.stats(), **inner}
+
+    async def usage(self) -> dict:
+        return await self.backend.usage()
+
+    async def supported_languages(self) -> set:
+        return await self.backend.supported_languages()
+
+    async def refresh_usage(self):
+        await self.backend.refresh_usage()
+
+    async def close(self):
+        await self.backend.close()
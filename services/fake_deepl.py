@@ -0,0 +1,153 @@
+"""Локальный fake-DeepL для нагрузочных прогонов без обращения к настоящему API.
+
+Запуск:
+    python -m services.fake_deepl --port 8081 --latency 0.2 --error-rate 0.05 --quota 500000
+
+После этого бот переключается на него без изменений кода:
+    DEEPL_API_URL=http://127.0.0.1:8081/v2/translate python bot.py
+"""
+import argparse
+import asyncio
+import random
+import re
+from aiohttp import web
+
+from services.backends import DEFAULT_LANGUAGES
+from services.language import detect_language
+
+# Текст вне HTML-тегов — его «переводим», теги и плейсхолдеры оставляем как есть
+TEXT_OUTSIDE_TAGS_RE = re.compile(r'(<[^<>]+>)')
+
+
+def fake_translate(text: str, target_lang: str) -> str:
+    """Детерминированный «перевод»: помечает каждый текстовый фрагмент кодом языка."""
+    parts = TEXT_OUTSIDE_TAGS_RE.split(text)
+    return "".join(
+        part if part.startswith("<") or not part.strip() else f"[{target_lang}] {part}"
+        for part in parts
+    )
+
+
+class FakeDeepLState:
+    """Настройки и счётчики fake-сервера."""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        character_limit: int = 0,
+        api_key: str = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.character_limit = character_limit  # 0 — без лимита
+        self.api_key = api_key  # None — не проверяем ключ
+        self.character_count = 0
+        self.requests = 0
+        self.errors = 0
+
+
+def create_fake_deepl_app(state: FakeDeepLState = None) -> web.Application:
+    """Создаёт aiohttp-приложение, повторяющее нужную боту часть DeepL API v2."""
+    state = state or FakeDeepLState()
+    app = web.Application()
+    app["state"] = state
+
+    def check_auth(request: web.Request):
+        if state.api_key and request.headers.get("Authorization") != f"DeepL-Auth-Key {state.api_key}":
+            raise web.HTTPForbidden(text='{"message": "Wrong auth key"}', content_type="application/json")
+
+    async def translate(request: web.Request):
+        check_auth(request)
+        state.requests += 1
+
+        data = await request.post()
+        texts = data.getall("text", [])
+        target_lang = (data.get("target_lang") or "").upper()
+        if not texts or not target_lang:
+            return web.json_response({"message": "Parameter 'text' or 'target_lang' not specified"}, status=400)
+
+        await asyncio.sleep(max(0.0, state.latency + random.uniform(-state.jitter, state.jitter)))
+
+        if random.random() < state.rate_limit_rate:
+            state.errors += 1
+            return web.json_response(
+                {"message": "Too many requests"}, status=429, headers={"Retry-After": str(state.retry_after)}
+            )
+        if random.random() < state.error_rate:
+            state.errors += 1
+            return web.json_response({"message": "Internal error"}, status=503)
+
+        characters = sum(len(text) for text in texts)
+        if state.character_limit and state.character_count + characters > state.character_limit:
+            state.errors += 1
+            return web.json_response({"message": "Quota exceeded"}, status=456)
+        state.character_count += characters
+
+        source_lang = (data.get("source_lang") or "").upper()
+        return web.json_response({
+            "translations": [
+                {
+                    "detected_source_language": source_lang or detect_language(text, min_words=1) or "EN",
+                    "text": fake_translate(text, target_lang),
+                }
+                for text in texts
+            ]
+        })
+
+    async def usage(request: web.Request):
+        check_auth(request)
+        return web.json_response({"character_count": state.character_count, "character_limit": state.character_limit})
+
+    async def languages(request: web.Request):
+        check_auth(request)
+        return web.json_response([{"language": code, "name": code} for code in sorted(DEFAULT_LANGUAGES)])
+
+    async def stats(request: web.Request):
+        return web.json_response({
+            "requests": state.requests,
+            "errors": state.errors,
+            "character_count": state.character_count,
+        })
+
+    app.router.add_post("/v2/translate", translate)
+    app.router.add_get("/v2/usage", usage)
+    app.router.add_get("/v2/languages", languages)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный fake-DeepL для нагрузочных прогонов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="Средняя задержка ответа (сек)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Разброс задержки ± (сек)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After для ответов 429 (сек)")
+    parser.add_argument("--quota", type=int, default=0, help="Лимит символов (0 — без лимита)")
+    parser.add_argument("--api-key", default=None, help="Требовать этот ключ в Authorization")
+    args = parser.parse_args()
+
+    state = FakeDeepLState(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        character_limit=args.quota,
+        api_key=args.api_key,
+    )
+    print(f"✅ Fake-DeepL запущен: http://{args.host}:{args.port}/v2/translate")
+    web.run_app(create_fake_deepl_app(state), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import deque
+from services.backends import TranslationBackend, TranslationError
+
+
+class DeadlineExceededError(TranslationError):
+    """Бэкенд не уложился в дедлайн вызова."""
+
+
+class LatencyTracker:
+    """Скользящее окно задержек успешных вызовов для расчёта перцентилей."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgingBackend:
+    """Обёртка над бэкендом: дедлайн на каждый вызов и (опционально) hedged-дубль медленного запроса.
+
+    Если ответ не пришёл за p95 недавних задержек, отправляется второй такой же запрос;
+    побеждает первый успешный ответ, проигравший отменяется.
+    """
+
+    def __init__(
+        self,
+        backend: TranslationBackend,
+        deadline: float = 20,
+        hedging_enabled: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 0.3,
+        hedge_min_samples: int = 20,
+    ):
+        self.backend = backend
+        self.name = backend.name
+        self.deadline = deadline
+        self.hedging_enabled = hedging_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.deadlines_exceeded = 0
+
+    def hedge_delay(self):
+        """Задержка перед дублем или None, если замеров ещё мало."""
+        if not self.hedging_enabled or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    def split_batches(self, texts: list) -> list:
+        return self.backend.split_batches(texts)
+
+    def cache_options(self, target_lang: str) -> tuple:
+        return self.backend.cache_options(target_lang)
+
+    async def _timed_call(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        started_at = time.monotonic()
+        result = await self.backend.translate_batch(texts, target_lang, source_lang)
+        self.latency.add(time.monotonic() - started_at)
+        return result
+
+    async def _hedged_call(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        primary = asyncio.ensure_future(self._timed_call(texts, target_lang, source_lang))
+        tasks = {primary}
+        delay = self.hedge_delay()
+
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedges_fired += 1
+                    tasks.add(asyncio.ensure_future(self._timed_call(texts, target_lang, source_lang)))
+
+            # Ждём первый успешный ответ; ошибка одного запроса не отменяет второй
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()  # Проигравший запрос больше не нужен
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        self.calls += 1
+        try:
+            if self.deadline > 0:
+                return await asyncio.wait_for(self._hedged_call(texts, target_lang, source_lang), timeout=self.deadline)
+            return await self._hedged_call(texts, target_lang, source_lang)
+        except asyncio.TimeoutError:
+            self.deadlines_exceeded += 1
+            raise DeadlineExceededError(f"Бэкенд не ответил за {self.deadline:.0f} сек")
+
+    def stats(self) -> dict:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+    async def usage(self) -> dict:
+        return await self.backend.usage()
+
+    async def supported_languages(self) -> set:
+        return await self.backend.supported_languages()
+
+    async def refresh_usage(self):
+        await self.backend.refresh_usage()
+
+    async def close(self):
+        await self.backend.close()
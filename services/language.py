@@ -0,0 +1,126 @@
+import re
+from collections import Counter
+from typing import Optional
+
+# Теги, HTML-сущности, плейсхолдеры и ссылки не участвуют в определении языка
+NOISE_RE = re.compile(r'<[^<>]*>|&\w+;|&#\d+;|(?:https?://|www\.)\S+|[@#]\w+')
+WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+CYRILLIC_RE = re.compile(r'[Ѐ-ӿ]')
+KANA_RE = re.compile(r'[぀-ヿ]')
+HAN_RE = re.compile(r'[一-鿿]')
+LATIN_RE = re.compile(r'[A-Za-zÀ-ɏ]')
+# Буквы, которых нет в русском: украинские, белорусская, сербские, болгарская ѝ
+OTHER_CYRILLIC_RE = re.compile(r'[іїєґўјљњћђџѝІЇЄҐЎЈЉЊЋЂЏЍ]')
+# Буквы, которые есть в русском, но не в украинском и болгарском (ъ есть в болгарском)
+RUSSIAN_ONLY_RE = re.compile(r'[ыэёЫЭЁ]')
+
+# Письменность языка — для проверки, что подсказка не противоречит тексту (остальные — латиница)
+LANGUAGE_SCRIPTS = {"RU": "cyrillic", "UK": "cyrillic", "BG": "cyrillic", "JA": "cjk", "ZH": "cjk"}
+
+# Частые служебные слова латинских языков (достаточно, чтобы уверенно узнать язык поста)
+STOPWORDS = {
+    "EN": {"the", "and", "is", "are", "to", "of", "in", "for", "with", "you", "this", "that", "on", "it", "be", "we", "our", "your", "now", "from"},
+    "DE": {"der", "die", "das", "und", "ist", "nicht", "mit", "sie", "ich", "ein", "eine", "zu", "den", "auf", "für", "wir", "auch", "jetzt"},
+    "FR": {"le", "la", "les", "et", "est", "un", "une", "des", "pour", "dans", "avec", "vous", "nous", "pas", "que", "sur", "du", "au"},
+    "ES": {"el", "los", "las", "y", "es", "un", "una", "por", "para", "con", "que", "del", "se", "no", "su", "al", "como", "ahora"},
+    "IT": {"il", "lo", "gli", "e", "è", "di", "che", "per", "con", "una", "sono", "non", "della", "del", "anche", "ora", "nel"},
+    "NL": {"de", "het", "een", "en", "is", "van", "niet", "met", "voor", "op", "dat", "zijn", "wij", "jullie", "ook", "nu"},
+    "PL": {"i", "w", "na", "nie", "jest", "się", "że", "do", "z", "to", "dla", "jak", "oraz", "już", "teraz", "są"},
+    "PT": {"o", "os", "as", "e", "é", "um", "uma", "para", "com", "não", "que", "do", "da", "em", "no", "na", "agora"},
+}
+
+# Служебные слова русского, которых нет в украинском и болгарском
+RUSSIAN_STOPWORDS = {"что", "это", "уже", "только", "если", "когда", "его", "она", "они", "мы", "вы", "ещё", "еще", "где", "чтобы", "теперь", "сейчас", "очень"}
+
+
+def base_language(code: str) -> str:
+    """EN-GB → EN, PT-BR → PT."""
+    return (code or "").upper().split("-")[0]
+
+
+def detect_language(text: str, min_words: int = 4) -> Optional[str]:
+    """Дешёвое локальное определение языка. Возвращает код языка или None, если не уверены.
+
+    Язык определяется только для текста в одной письменности: по этой догадке перевод
+    могут пропустить, поэтому «Привет! Check our new store» — решать бэкенду.
+    Кириллица считается русским, только если нет букв других кириллических языков
+    и есть русские приметы (ы, э, ё или служебные слова).
+    """
+    text = NOISE_RE.sub(" ", text)
+
+    cyrillic = len(CYRILLIC_RE.findall(text))
+    kana = len(KANA_RE.findall(text))
+    han = len(HAN_RE.findall(text))
+    latin = len(LATIN_RE.findall(text))
+    letters = sum(char.isalpha() for char in text)  # Включая письменности, которые мы не различаем
+    if not letters:
+        return None
+
+    if kana and kana + han == letters:
+        return "JA"
+    if han == letters:
+        return "ZH"
+    if cyrillic == letters:
+        if OTHER_CYRILLIC_RE.search(text):
+            return None  # Украинский, белорусский, сербский… — пусть решает бэкенд
+        if RUSSIAN_ONLY_RE.search(text):
+            return "RU"
+        words = [word.lower() for word in WORD_RE.findall(text)]
+        hits = sum(word in RUSSIAN_STOPWORDS for word in words)
+        return "RU" if len(words) >= min_words and hits >= max(2, len(words) // 10) else None
+    if latin != letters:
+        return None  # Смешанный текст или другая письменность — пусть решает бэкенд
+
+    words = [word.lower() for word in WORD_RE.findall(text)]
+    if len(words) < min_words:
+        return None
+
+    scores = Counter({language: sum(word in stopwords for word in words) for language, stopwords in STOPWORDS.items()})
+    (best, best_score), (_, second_score) = scores.most_common(2)
+    # Нужны и заметная доля служебных слов, и явный отрыв от второго кандидата
+    if best_score >= max(2, len(words) // 10) and best_score >= 2 * second_score:
+        return best
+    return None
+
+
+def fits_language(text: str, language: str) -> bool:
+    """False, если текст точно не на `language`: другая письменность, чужие буквы или другой язык по detect_language."""
+    language = base_language(language)
+    text = NOISE_RE.sub(" ", text)
+    letters = sum(char.isalpha() for char in text)
+    if not letters:
+        return True  # Эмодзи, цифры, ссылки — не противоречат ничему
+
+    script = LANGUAGE_SCRIPTS.get(language, "latin")
+    if script == "cyrillic":
+        in_script = len(CYRILLIC_RE.findall(text))
+    elif script == "cjk":
+        in_script = len(KANA_RE.findall(text)) + len(HAN_RE.findall(text))
+    else:
+        in_script = len(LATIN_RE.findall(text))
+    if in_script != letters:
+        return False
+    if language == "RU" and OTHER_CYRILLIC_RE.search(text):
+        return False
+
+    guess = detect_language(text)
+    return guess is None or guess == language
+
+
+class SourceLanguageMemory:
+    """Запоминает язык оригинала для каждого главного канала (по ответам бэкенда)."""
+
+    def __init__(self, max_chats: int = 10000):
+        self.max_chats = max_chats
+        self._languages = {}
+
+    def get(self, chat_id) -> Optional[str]:
+        return self._languages.get(chat_id)
+
+    def remember(self, chat_id, language: str):
+        if chat_id is None or not language:
+            return
+        if chat_id not in self._languages and len(self._languages) >= self.max_chats:
+            self._languages.pop(next(iter(self._languages)))
+        self._languages[chat_id] = base_language(language)
@@ -0,0 +1,70 @@
+"""Локальные движки перевода для ProcessPoolBackend.
+
+Движок — любой объект с методом `translate(texts, target_lang) -> list` и (необязательно)
+атрибутом `supported_languages`. Фабрика указывается в LOCAL_TRANSLATOR_ENGINE как `модуль:функция`.
+
+Замер масштабирования по ядрам на детерминированном движке:
+    python -m services.local_engines --workers 1 2 4 --languages 8 --texts 400
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+
+from services.backends import DEFAULT_LANGUAGES, ProcessPoolBackend
+
+
+class DummyEngine:
+    """Детерминированный CPU-движок: помечает текст кодом языка и честно нагружает процессор."""
+
+    supported_languages = DEFAULT_LANGUAGES
+
+    def __init__(self, work_per_char: int = 200):
+        self.work_per_char = work_per_char
+
+    def translate(self, texts: list, target_lang: str) -> list:
+        translations = []
+        for text in texts:
+            digest = text.encode("utf-8")
+            for _ in range(self.work_per_char * max(1, len(text)) // 32):
+                digest = hashlib.sha256(digest).digest()  # Имитация инференса модели
+            translations.append(f"[{target_lang.upper()}] {text}")
+        return translations
+
+
+def dummy_engine():
+    return DummyEngine()
+
+
+async def benchmark(workers: int, languages: list, texts_per_language: int) -> float:
+    """Переводит одинаковую нагрузку и возвращает число текстов в секунду."""
+    backend = ProcessPoolBackend("services.local_engines:dummy_engine", workers=workers)
+    await backend.warm_up()
+
+    texts = [f"Sample post number {i} with some words to translate" for i in range(texts_per_language)]
+    started_at = time.perf_counter()
+    await asyncio.gather(*(
+        backend.translate_batch(batch, language)
+        for language in languages
+        for batch in backend.split_batches(texts)
+    ))
+    elapsed = time.perf_counter() - started_at
+    await backend.close()
+    return len(languages) * texts_per_language / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер пропускной способности ProcessPoolBackend")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--languages", type=int, default=8)
+    parser.add_argument("--texts", type=int, default=400)
+    args = parser.parse_args()
+
+    languages = sorted(DEFAULT_LANGUAGES)[:args.languages]
+    for workers in args.workers:
+        throughput = asyncio.run(benchmark(workers, languages, args.texts))
+        print(f"⚙ workers={workers}: {throughput:.0f} текстов/сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import MEDIA_GROUP_QUIET_PERIOD, MEDIA_GROUP_MAX_WAIT, MEDIA_GROUP_MAX_PENDING, MEDIA_GROUP_SEEN_TTL
+
+# Telegram не собирает в альбом больше 10 файлов
+MEDIA_GROUP_MAX_ITEMS = 10
+
+
+class PendingMediaGroup:
+    """Части одного альбома, которые ещё приходят."""
+
+    def __init__(self):
+        self.messages = []
+        self.started_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MediaGroupCollector:
+    """Собирает части альбома по media_group_id и отдаёт их одним списком.
+
+    Альбом считается полным, когда части перестали приходить на `quiet_period` секунд,
+    набралось 10 частей или прошло `max_wait` секунд с первой части. Весь альбом получает
+    обработчик первой части, остальные обработчики сразу завершаются.
+    """
+
+    def __init__(self, quiet_period: float = 1, max_wait: float = 5, max_pending: int = 500, seen_ttl: float = 60):
+        self.quiet_period = quiet_period
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.seen_ttl = seen_ttl
+        self._groups = {}  # media_group_id -> PendingMediaGroup (в порядке появления)
+        self._flushed = OrderedDict()  # media_group_id -> время сброса (чтобы отсечь опоздавшие части)
+        self.albums = 0
+        self.late_parts = 0
+
+    def __len__(self):
+        return len(self._groups)
+
+    def _forget_expired(self):
+        now = time.monotonic()
+        while self._flushed and now - next(iter(self._flushed.values())) > self.seen_ttl:
+            self._flushed.popitem(last=False)
+
+    def _schedule(self, group_id: str, group: PendingMediaGroup):
+        if group.timer is not None:
+            group.timer.cancel()
+        delay = min(self.quiet_period, max(0.0, group.started_at + self.max_wait - time.monotonic()))
+        group.timer = asyncio.get_running_loop().call_later(delay, self._flush, group_id)
+
+    def _flush(self, group_id: str):
+        group = self._groups.pop(group_id, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+        self._flushed[group_id] = time.monotonic()
+        self.albums += 1
+        if not group.future.done():
+            group.future.set_result(sorted(group.messages, key=lambda m: m.message_id))
+
+    async def collect(self, message) -> Optional[list]:
+        """Добавляет часть альбома. Обработчику первой части возвращает весь альбом, остальным — None."""
+        group_id = message.media_group_id
+        self._forget_expired()
+
+        if group_id in self._flushed:
+            self.late_parts += 1
+            print(f"⚠ Часть альбома {group_id} пришла после публикации — пропускаем")
+            return None
+
+        group = self._groups.get(group_id)
+        is_first = group is None
+        if is_first:
+            if len(self._groups) >= self.max_pending:
+                self._flush(next(iter(self._groups)))  # Память ограничена: самый старый альбом отдаём как есть
+            group = self._groups[group_id] = PendingMediaGroup()
+
+        group.messages.append(message)
+        if len(group.messages) >= MEDIA_GROUP_MAX_ITEMS:
+            self._flush(group_id)
+        else:
+            self._schedule(group_id, group)
+
+        if not is_first:
+            return None
+        return await group.future
+
+    def stats(self) -> dict:
+        return {"pending": len(self._groups), "albums": self.albums, "late_parts": self.late_parts}
+
+
+# ✅ Общий сборщик альбомов процесса
+media_groups = MediaGroupCollector(
+    quiet_period=MEDIA_GROUP_QUIET_PERIOD,
+    max_wait=MEDIA_GROUP_MAX_WAIT,
+    max_pending=MEDIA_GROUP_MAX_PENDING,
+    seen_ttl=MEDIA_GROUP_SEEN_TTL,
+)
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Асинхронный token bucket: не больше `rate` единиц в секунду с запасом `capacity` на всплески."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """Забирает токены без ожидания. Возвращает False, если их сейчас не хватает."""
+        if not self.enabled:
+            return True
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def delay_for(self, amount: float = 1) -> float:
+        """Сколько секунд ждать, пока накопится `amount` токенов."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float = 1):
+        """Ждёт, пока накопится `amount` токенов (ожидающие обслуживаются по очереди)."""
+        if not self.enabled:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # Запрос больше ёмкости ведра ждёт полного ведра, а не вечно
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
@@ -0,0 +1,68 @@
+"""Отправляет записанные апдейты Telegram в webhook бота — для локальной проверки и нагрузочных прогонов.
+
+Запуск (бот запущен с BOT_MODE=webhook):
+    python -m services.replay_updates updates.jsonl --url http://127.0.0.1:8080/webhook --secret $WEBHOOK_SECRET
+
+Файл — JSON-массив апдейтов или по одному апдейту в строке (как их присылает Telegram).
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+import aiohttp
+
+
+def load_updates(path: str) -> list:
+    with open(path, encoding="utf-8") as file:
+        content = file.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+async def replay(updates: list, url: str, secret: str = None, concurrency: int = 10, repeat: int = 1) -> Counter:
+    """POST'ит апдейты в webhook. Возвращает счётчик HTTP-статусов."""
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = Counter()
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def post(update_id: int, update: dict):
+            async with semaphore:
+                try:
+                    async with session.post(url, json={**update, "update_id": update_id}) as response:
+                        statuses[response.status] += 1
+                except aiohttp.ClientError as e:
+                    statuses[type(e).__name__] += 1
+
+        # Каждому повтору — свой update_id, как у настоящих апдейтов
+        jobs = [
+            post(update.get("update_id", 0) + round_number * len(updates), update)
+            for round_number in range(repeat)
+            for update in updates
+        ]
+        await asyncio.gather(*jobs)
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отправка записанных апдейтов в webhook бота")
+    parser.add_argument("path", help="Файл с апдейтами (JSON-массив или JSON lines)")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default=None, help="Значение WEBHOOK_SECRET")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных запросов")
+    parser.add_argument("--repeat", type=int, default=1, help="Сколько раз прогнать файл")
+    args = parser.parse_args()
+
+    updates = load_updates(args.path)
+    started_at = time.monotonic()
+    statuses = asyncio.run(replay(updates, args.url, args.secret, args.concurrency, args.repeat))
+    elapsed = time.monotonic() - started_at
+
+    total = sum(statuses.values())
+    print(f"📨 Отправлено {total} апдейтов за {elapsed:.2f} сек ({total / elapsed:.1f}/сек): {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import deque
+from config import RETRY_QUEUE_MAX_SIZE, RETRY_QUEUE_MAX_ATTEMPTS, RETRY_QUEUE_TTL, RETRY_QUEUE_INTERVAL
+from services.backends import TranslationError
+
+
+class DeferredJob:
+    """Отложенная задача: фабрика корутины и счётчики попыток."""
+
+    def __init__(self, description: str, factory):
+        self.description = description
+        self.factory = factory
+        self.created_at = time.monotonic()
+        self.attempts = 0
+
+
+class RetryQueue:
+    """Очередь постов, которые не удалось перевести: публикуются, когда бэкенд перевода снова доступен.
+
+    Обработчик апдейтов не ждёт восстановления — он только кладёт задачу в очередь.
+    """
+
+    def __init__(self, max_size: int = 200, max_attempts: int = 10, ttl: float = 21600, interval: float = 5):
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.ttl = ttl
+        self.interval = interval
+        self._jobs = deque()
+        self.parked = 0
+        self.published = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def park(self, description: str, factory) -> DeferredJob:
+        """Откладывает задачу. При переполнении вытесняется самая старая."""
+        if len(self._jobs) >= self.max_size:
+            oldest = self._jobs.popleft()
+            self.dropped += 1
+            print(f"🗑 Очередь повторов переполнена, отбрасываем: {oldest.description}")
+
+        job = DeferredJob(description, factory)
+        self._jobs.append(job)
+        self.parked += 1
+        print(f"📥 Отложено до восстановления перевода: {description} (в очереди: {len(self._jobs)})")
+        return job
+
+    async def process(self, is_available) -> int:
+        """Выполняет накопленные задачи, пока бэкенд доступен. Возвращает число опубликованных."""
+        published = 0
+
+        for _ in range(len(self._jobs)):
+            if not self._jobs or not is_available():
+                break
+
+            job = self._jobs.popleft()
+            if time.monotonic() - job.created_at > self.ttl:
+                self.dropped += 1
+                print(f"⌛ Отложенная задача устарела: {job.description}")
+                continue
+
+            job.attempts += 1
+            try:
+                await job.factory()
+            except TranslationError as e:
+                if job.attempts >= self.max_attempts:
+                    self.dropped += 1
+                    print(f"❌ Отложенная задача отброшена после {job.attempts} попыток: {job.description} ({e})")
+                else:
+                    self._jobs.append(job)  # Вернём в конец очереди и попробуем позже
+                    print(f"⏳ Повтор не удался ({job.attempts}/{self.max_attempts}): {job.description} ({e})")
+            except Exception as e:
+                self.dropped += 1
+                print(f"❌ Ошибка отложенной задачи {job.description}: {e}")
+            else:
+                published += 1
+                self.published += 1
+                print(f"✅ Отложенная задача выполнена: {job.description}")
+
+        return published
+
+    async def run(self, is_available):
+        """Фоновый цикл очереди повторов."""
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._jobs:
+                await self.process(is_available)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._jobs), "parked": self.parked, "published": self.published, "dropped": self.dropped}
+
+
+# ✅ Общая очередь повторов процесса
+retry_queue = RetryQueue(
+    max_size=RETRY_QUEUE_MAX_SIZE,
+    max_attempts=RETRY_QUEUE_MAX_ATTEMPTS,
+    ttl=RETRY_QUEUE_TTL,
+    interval=RETRY_QUEUE_INTERVAL,
+)
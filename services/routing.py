@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import NamedTuple
+from config import ROUTING_CACHE_TTL
+from database.queries import orm_get_routes
+
+
+class RouteTarget(NamedTuple):
+    """Канал, в который публикуется перевод (те же поля, что у Channel)."""
+
+    chat_id: int
+    language: str
+
+
+class Route(NamedTuple):
+    """Куда публиковать посты главного канала для одного владельца."""
+
+    owner_id: int
+    targets: tuple
+
+
+class RoutingTable:
+    """Кэш маршрутов: chat_id главного канала → владельцы и их каналы для переводов.
+
+    Все маршруты загружаются при старте. Канала нет в кэше или запись устарела
+    (`ttl`, invalidate из админки) — маршрут для одного chat_id читается из БД по индексу
+    и запоминается, в том числе «не главный канал». Реплики бота видят изменения,
+    сделанные через другую реплику, не позже чем через `ttl` секунд.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._routes = {}  # chat_id -> (tuple[Route], время загрузки)
+        self._locks = {}  # chat_id -> asyncio.Lock (одна загрузка на канал)
+        self.reloads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and (self.ttl <= 0 or time.monotonic() - entry[1] <= self.ttl)
+
+    def invalidate(self):
+        """Сбрасывает кэш — маршруты перечитаются при следующих постах."""
+        self._routes.clear()
+
+    def _store(self, routes: dict, loaded_at: float):
+        for chat_id, owners in routes.items():
+            self._routes[chat_id] = (
+                tuple(Route(owner_id, tuple(RouteTarget(*target) for target in targets)) for owner_id, targets in owners),
+                loaded_at,
+            )
+
+    async def reload(self, session):
+        """Загружает маршруты всех главных каналов."""
+        routes = await orm_get_routes(session)
+        self._routes.clear()
+        self._store(routes, time.monotonic())
+        self.reloads += 1
+        print(f"🧭 Маршруты загружены: {len(self._routes)} главных каналов")
+
+    async def resolve(self, chat_id: int, session) -> tuple:
+        """Маршруты для поста из `chat_id` (пустой кортеж — канал не главный)."""
+        entry = self._routes.get(chat_id)
+        if self._fresh(entry):
+            self.hits += 1
+            return entry[0]
+
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            entry = self._routes.get(chat_id)
+            if not self._fresh(entry):  # Пока ждали блокировку, маршрут мог загрузить другой пост
+                self.misses += 1
+                try:
+                    loaded_at = time.monotonic()
+                    routes = await orm_get_routes(session, chat_id)
+                    self._routes[chat_id] = ((), loaded_at)
+                    self._store(routes, loaded_at)
+                except Exception as e:
+                    print(f"⚠ Не удалось обновить маршрут {chat_id}, используем прежний: {e}")
+                    if entry is None:
+                        return ()
+                entry = self._routes.get(chat_id, entry)
+        self._locks.pop(chat_id, None)
+        return entry[0]
+
+    def stats(self) -> dict:
+        return {"routes": len(self._routes), "reloads": self.reloads, "hits": self.hits, "misses": self.misses}
+
+
+# ✅ Общая таблица маршрутов процесса
+routing_table = RoutingTable(ttl=ROUTING_CACHE_TTL)
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import deque
+from aiogram.exceptions import TelegramRetryAfter
+from config import (
+    SEND_CONCURRENCY, TELEGRAM_GLOBAL_PER_SECOND, TELEGRAM_CHAT_PER_MINUTE, TELEGRAM_CHAT_BURST,
+    TELEGRAM_MAX_FLOOD_RETRIES
+)
+from services.rate_limit import TokenBucket
+
+
+class SendJob:
+    """Один вызов Telegram API: фабрика корутины, «стоимость» в сообщениях и счётчик flood-wait."""
+
+    def __init__(self, chat_id: int, description: str, factory, cost: int = 1):
+        self.chat_id = chat_id
+        self.description = description
+        self.factory = factory
+        self.cost = cost
+        self.created_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueue:
+    """Очередь исходящих сообщений в Telegram с пулом воркеров.
+
+    В каждый чат одновременно уходит не больше одного сообщения (порядок постов сохраняется),
+    скорость ограничена token bucket'ами на чат и на весь бот, а при TelegramRetryAfter
+    сообщение повторяется через указанную сервером паузу. Обработчики только ставят задачи в очередь.
+    """
+
+    def __init__(
+        self,
+        workers: int = 5,
+        global_per_second: float = 25,
+        chat_per_minute: float = 20,
+        chat_burst: float = 5,
+        max_flood_retries: int = 5,
+    ):
+        self.workers = max(1, workers)
+        self.global_bucket = TokenBucket(global_per_second)
+        self.chat_rate = chat_per_minute / 60
+        self.chat_burst = chat_burst
+        self.max_flood_retries = max_flood_retries
+        self._chats = {}  # chat_id -> deque[SendJob]; чат есть здесь, пока у него есть неотправленные задачи
+        self._buckets = {}  # chat_id -> TokenBucket
+        self._ready: asyncio.Queue = None
+        self._tasks = []
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    def __len__(self):
+        return sum(len(jobs) for jobs in self._chats.values())
+
+    def _ready_queue(self) -> asyncio.Queue:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        return self._ready
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self._buckets:
+            self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return self._buckets[chat_id]
+
+    def _schedule(self, chat_id: int, delay: float):
+        """Вернёт чат воркерам через `delay` секунд (воркер в это время обслуживает другие чаты)."""
+        asyncio.get_running_loop().call_later(delay, self._ready_queue().put_nowait, chat_id)
+
+    def enqueue(self, chat_id: int, description: str, factory, cost: int = 1) -> SendJob:
+        """Ставит вызов Telegram API в очередь чата. `factory()` должна возвращать корутину."""
+        job = SendJob(chat_id, description, factory, cost)
+        if chat_id not in self._chats:
+            self._chats[chat_id] = deque()
+            self._ready_queue().put_nowait(chat_id)
+        self._chats[chat_id].append(job)
+        self.enqueued += 1
+        return job
+
+    async def _process(self, chat_id: int):
+        jobs = self._chats.get(chat_id)
+        if not jobs:
+            self._chats.pop(chat_id, None)
+            return
+
+        job = jobs[0]
+        delay = self._chat_bucket(chat_id).delay_for(job.cost)
+        if delay > 0:
+            self._schedule(chat_id, delay)
+            return
+        self._chat_bucket(chat_id).try_acquire(job.cost)
+        await self.global_bucket.acquire(job.cost)
+
+        job.attempts += 1
+        try:
+            await job.factory()
+        except TelegramRetryAfter as e:
+            if job.attempts <= self.max_flood_retries:
+                # ✅ Сообщение остаётся первым в очереди чата — порядок не нарушается
+                self.flood_waits += 1
+                print(f"⏳ Flood wait {e.retry_after} сек для чата {chat_id}: {job.description} (очередь: {self.stats()})")
+                self._schedule(chat_id, e.retry_after)
+                return
+            self.failed += 1
+            print(f"❌ Отправка отброшена после {job.attempts} flood wait: {job.description}")
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Ошибка отправки в чат {chat_id}: {job.description} ({e})")
+        else:
+            self.sent += 1
+
+        jobs.popleft()
+        if jobs:
+            self._ready_queue().put_nowait(chat_id)
+        else:
+            del self._chats[chat_id]
+
+    async def _worker(self):
+        ready = self._ready_queue()
+        while True:
+            chat_id = await ready.get()
+            try:
+                await self._process(chat_id)
+            except Exception as e:
+                print(f"❌ Ошибка очереди отправки (чат {chat_id}): {e}")
+                if chat_id in self._chats:
+                    self._schedule(chat_id, 1)
+
+    def start(self):
+        """Запускает воркеров (вызывается из bot.py::main)."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self, timeout: float = 10):
+        """Даёт очереди дослать сообщения (не дольше `timeout` секунд) и останавливает воркеров."""
+        deadline = time.monotonic() + timeout
+        while self._chats and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._chats:
+            print(f"⚠ Остановка: не отправлено {len(self)} сообщений")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        depths = [len(jobs) for jobs in self._chats.values()]
+        return {
+            "queued": sum(depths),
+            "chats": len(depths),
+            "max_chat_depth": max(depths, default=0),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+        }
+
+
+# ✅ Общая очередь отправки процесса
+send_queue = SendQueue(
+    workers=SEND_CONCURRENCY,
+    global_per_second=TELEGRAM_GLOBAL_PER_SECOND,
+    chat_per_minute=TELEGRAM_CHAT_PER_MINUTE,
+    chat_burst=TELEGRAM_CHAT_BURST,
+    max_flood_retries=TELEGRAM_MAX_FLOOD_RETRIES,
+)
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from config import (
+    STATS_MAX_STALENESS, STATS_HOURLY_RETENTION_DAYS, STATS_DAILY_RETENTION_DAYS, STATS_COMPACTION_INTERVAL
+)
+from database.db import AsyncSessionLocal
+from database.queries import orm_compact_statistics_buckets, orm_flush_statistics
+
+
+def hour_start(moment: datetime = None) -> datetime:
+    """Начало часа (UTC), к которому относится событие."""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def merge_counters(target: dict, increments: dict):
+    """Прибавляет счётчики `increments` к `target` (ключ → список чисел)."""
+    for key, counters in increments.items():
+        pending = target.setdefault(key, [0] * len(counters))
+        for index, value in enumerate(counters):
+            pending[index] += value
+
+
+class StatisticsBuffer:
+    """Копит счётчики статистики в памяти и сбрасывает их в БД одним атомарным upsert.
+
+    Обработчик поста не ждёт БД: он только прибавляет счётчики. Данные в БД отстают
+    не больше чем на `max_staleness` секунд; при остановке бота буфер сбрасывается.
+    Если запись не удалась, счётчики остаются в буфере до следующего сброса.
+
+    Кроме итогов владельца копятся часовые срезы (владелец, канал, язык, час) —
+    час определяется в момент поста, поэтому задержка сброса не сдвигает данные между часами.
+    """
+
+    def __init__(self, max_staleness: float = 10):
+        self.max_staleness = max_staleness
+        self._pending = {}  # owner_id -> [сообщений, слов, символов]
+        self._buckets = {}  # (owner_id, chat_id, язык, начало часа) -> [сообщений, слов, символов, оплачиваемых символов]
+        self._lock = None
+        self._stopping = asyncio.Event()  # close() останавливает run() без cancel — сброс не прерывается на середине
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_at = None
+
+    def __len__(self):
+        return len(self._pending) + len(self._buckets)
+
+    def _schedule_flush(self):
+        if self.max_staleness <= 0:
+            asyncio.ensure_future(self.flush())  # Без буферизации — пишем сразу, но не в обработчике
+
+    def add(self, owner_id: int, text: str = None, messages: int = 1):
+        """Учитывает переведённый пост владельца (слова и символы считаются как раньше)."""
+        counters = self._pending.setdefault(owner_id, [0, 0, 0])
+        counters[0] += messages
+        counters[1] += len(text.split()) if text else 0
+        counters[2] += len(text) if text else 0
+        self._schedule_flush()
+
+    def add_channels(self, targets: list, language: str, text: str = None, billed_characters: int = 0):
+        """Учитывает публикацию перевода на `language` в каналы `targets` — [(owner_id, chat_id)].
+
+        Перевод на язык оплачивается один раз на все его каналы, поэтому `billed_characters`
+        делятся между ними: сумма по каналам равна реальному расходу.
+        """
+        if not targets:
+            return
+        words = len(text.split()) if text else 0
+        characters = len(text) if text else 0
+        share, remainder = divmod(billed_characters, len(targets))
+        bucket_start = hour_start()
+
+        for index, (owner_id, chat_id) in enumerate(targets):
+            counters = self._buckets.setdefault((owner_id, chat_id, language, bucket_start), [0, 0, 0, 0])
+            counters[0] += 1
+            counters[1] += words
+            counters[2] += characters
+            counters[3] += share + (1 if index < remainder else 0)
+        self._schedule_flush()
+
+    def pending(self, owner_id: int) -> tuple:
+        """Ещё не записанные в БД счётчики владельца: (сообщений, слов, символов)."""
+        return tuple(self._pending.get(owner_id, (0, 0, 0)))
+
+    async def flush(self) -> int:
+        """Записывает накопленное в БД. Возвращает число записанных строк (владельцы + срезы)."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not self._pending and not self._buckets:
+                return 0
+            totals, self._pending = self._pending, {}
+            buckets, self._buckets = self._buckets, {}
+            try:
+                async with AsyncSessionLocal() as session:
+                    await orm_flush_statistics(
+                        session,
+                        {owner: tuple(counters) for owner, counters in totals.items()},
+                        {key: tuple(counters) for key, counters in buckets.items()},
+                    )
+            except BaseException as e:
+                # Возвращаем счётчики в буфер (к ним могли добавиться новые)
+                merge_counters(self._pending, totals)
+                merge_counters(self._buckets, buckets)
+                if not isinstance(e, Exception):
+                    raise  # Отмена задачи: счётчики останутся до финального сброса
+                self.failed_flushes += 1
+                print(f"⚠ Не удалось записать статистику ({len(totals)} владельцев, {len(buckets)} срезов), повторим позже: {e}")
+                return 0
+
+            self.flushes += 1
+            self.last_flush_at = time.monotonic()
+            print(f"📊 Статистика записана: {len(totals)} владельцев, {len(buckets)} срезов")
+            return len(totals) + len(buckets)
+
+    async def run(self):
+        """Фоновый цикл: сброс не реже, чем раз в `max_staleness` секунд (до вызова close)."""
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=max(self.max_staleness, 1))
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    async def close(self):
+        """Останавливает run() и делает финальный сброс (дожидается сброса, который уже идёт)."""
+        self._stopping.set()
+        await self.flush()
+        if self._pending or self._buckets:
+            print(f"⚠ Остановка: статистика {len(self._pending)} владельцев и {len(self._buckets)} срезов не записана")
+
+    def stats(self) -> dict:
+        return {
+            "pending_owners": len(self._pending),
+            "pending_buckets": len(self._buckets),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+async def compact_statistics_periodically(
+    interval: float = STATS_COMPACTION_INTERVAL,
+    hourly_retention_days: int = STATS_HOURLY_RETENTION_DAYS,
+    daily_retention_days: int = STATS_DAILY_RETENTION_DAYS
+):
+    """Фоновая задача: сворачивает старые часовые срезы в дневные и удаляет дневные старше срока хранения."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                compacted, daily, removed = await orm_compact_statistics_buckets(
+                    session, hourly_retention_days, daily_retention_days
+                )
+            print(f"🗜 Статистика: {compacted} часовых срезов свёрнуто в {daily} дневных, удалено старых дневных: {removed}")
+        except Exception as e:
+            print(f"⚠ Ошибка сжатия статистики: {e}")
+        await asyncio.sleep(interval)
+
+
+# ✅ Общий буфер статистики процесса
+statistics_buffer = StatisticsBuffer(max_staleness=STATS_MAX_STALENESS)
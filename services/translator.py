@@ -1,64 +1,564 @@
-import aiohttp
-import os
+import asyncio
 import html
+import hashlib
 import re
+import sys
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Optional
+from config import (
+    DEEPL_API_KEY, DEEPL_API_URL, TRANSLATOR_BACKEND,
+    LOCAL_TRANSLATOR_ENGINE, LOCAL_TRANSLATOR_WORKERS, LOCAL_TRANSLATOR_BATCH_WINDOW, LOCAL_TRANSLATOR_MAX_BATCH,
+    TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_TTL, TRANSLATION_CACHE_MAX_TEXT_LENGTH,
+    TRANSLATION_MEMORY_ENABLED, TRANSLATION_MEMORY_MAX_AGE_DAYS, TRANSLATION_MEMORY_PRUNE_INTERVAL,
+    SOURCE_LANGUAGE_DETECTION
+)
+from database.db import AsyncSessionLocal
+from services.backends import (
+    ProcessPoolBackend, TranslationBackend, TranslationError, UnsupportedLanguageError, create_backend
+)
+from services.language import SourceLanguageMemory, base_language, detect_language, fits_language
+from database.queries import orm_get_translations, orm_save_translations, orm_prune_translation_memory
 
-DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
+# Открывающие и закрывающие HTML-теги (самозакрывающиеся <br/> не учитываем)
+HTML_TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9-]*)(?:\s[^<>]*?)?(?<!/)>')
+HTML_VOID_TAGS = {"br", "hr", "img"}
 
-SUPPORTED_LANGUAGES = {"EN", "DE", "FR", "ES", "RU", "IT", "NL", "PL", "PT", "JA", "ZH"}
+# ✅ Непереводимые фрагменты (заменяются плейсхолдерами перед отправкой в DeepL)
+PLACEHOLDER_TEMPLATE = "<x i={}/>"
+PLACEHOLDER_RE = re.compile(r'<x\s+i="?(\d+)"?\s*/?>(?:</x>)?')
+PROTECTED_BLOCK_RE = re.compile(r'<(pre|code)\b[^>]*>.*?</\1>', re.IGNORECASE | re.DOTALL)
+PROTECTED_INLINE_RE = re.compile(
+    r'(?P<url>(?:https?://|www\.)[^\s<>"]+[^\s<>".,;:!?)\]])'
+    r'|(?P<mention>(?<![\w.@])@\w{3,})'
+    r'|(?P<hashtag>(?<![\w&#])#\w+)'
+    r'|(?P<number>[$€£₽¥]?\d+(?:[.,:\s]\d+)*(?:\s?[$€£₽¥%])?)'
+    r'|(?P<emoji>[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]+)'
+)
 
-def prepare_text_for_translation(text):
-    """Заменяем переводы строк на <br>, чтобы DeepL сохранял форматирование."""
-    text = text.replace("\n", "<br>")  # Telegram использует \n, а DeepL лучше работает с <br>
-    return text
 
-def restore_line_breaks(text):
-    """Восстанавливает отступы и абзацы в переведенном тексте."""
-    text = re.sub(r'\s*<br\s*/?>\s*', '\n', text)  # Заменяем <br> на \n
-    text = re.sub(r'\s*</?(p|div)>\s*', '\n\n', text)  # <p> и <div> превращаем в абзацы
+# ✅ Бэкенд перевода процесса (создаётся в bot.py::main)
+_backend: Optional[TranslationBackend] = None
+
+
+def set_translation_backend(backend: TranslationBackend) -> TranslationBackend:
+    """Назначает бэкенд перевода для всего процесса."""
+    global _backend
+    _backend = backend
+    return _backend
+
+
+def get_translation_backend() -> TranslationBackend:
+    """Возвращает бэкенд перевода (создаёт бэкенд из конфига, если его ещё нет)."""
+    global _backend
+    if _backend is None:
+        if TRANSLATOR_BACKEND.lower() == ProcessPoolBackend.name:
+            _backend = create_backend(
+                TRANSLATOR_BACKEND,
+                engine=LOCAL_TRANSLATOR_ENGINE,
+                workers=LOCAL_TRANSLATOR_WORKERS,
+                batch_window=LOCAL_TRANSLATOR_BATCH_WINDOW,
+                max_batch_size=LOCAL_TRANSLATOR_MAX_BATCH,
+            )
+        else:
+            _backend = create_backend(TRANSLATOR_BACKEND, api_key=DEEPL_API_KEY, url=DEEPL_API_URL or None)
+    return _backend
+
+
+def translation_backend_available() -> bool:
+    """Доступен ли бэкенд перевода (False, пока circuit breaker разомкнут)."""
+    return getattr(get_translation_backend(), "available", True)
+
+
+async def close_translation_backend():
+    """Закрывает бэкенд перевода при остановке бота."""
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+class TranslationCache:
+    """Ограниченный кэш переводов в памяти с вытеснением по LRU и TTL.
+
+    Все операции синхронные (без await), поэтому безопасны при конкурентных корутинах asyncio.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 86400, max_text_length: int = 2000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_text_length = max_text_length
+        self._entries = OrderedDict()  # key -> (expires_at, translation, size_bytes)
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Нормализует текст перед хешированием (Unicode NFC, без краевых пробелов)."""
+        return unicodedata.normalize("NFC", text).strip()
+
+    def make_key(self, text: str, target_lang: str, options=()) -> str:
+        """Ключ кэша: хеш от (нормализованный текст, язык, параметры DeepL)."""
+        raw = "\x1f".join([self.normalize(text), target_lang.upper(), repr(tuple(options))])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, text: str) -> bool:
+        """Слишком длинные тексты в кэш не кладём."""
+        return self.max_entries > 0 and len(text) <= self.max_text_length
+
+    def get(self, key: str):
+        """Возвращает перевод или None (просроченные записи удаляются)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, translation, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)  # Свежеиспользованная запись — в конец очереди LRU
+        self.hits += 1
+        return translation
+
+    def set(self, key: str, translation: str):
+        """Сохраняет перевод, вытесняя самые старые записи при переполнении."""
+        if self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        size_bytes = sys.getsizeof(key) + sys.getsizeof(translation)
+        self._entries[key] = (time.monotonic() + self.ttl, translation, size_bytes)
+        self.memory_bytes += size_bytes
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, _, size_bytes = self._entries.pop(key)
+        self.memory_bytes -= size_bytes
+
+    def clear(self):
+        self._entries.clear()
+        self.memory_bytes = 0
+
+    def stats(self) -> dict:
+        """Счётчики кэша для логов и мониторинга."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self.memory_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# ✅ Общий кэш переводов процесса
+translation_cache = TranslationCache(
+    max_entries=TRANSLATION_CACHE_SIZE,
+    ttl=TRANSLATION_CACHE_TTL,
+    max_text_length=TRANSLATION_CACHE_MAX_TEXT_LENGTH,
+)
+
+
+class SingleFlight:
+    """Склеивает одинаковые одновременные запросы: первый вызывающий делает работу, остальные ждут его future.
+
+    Ошибка ведущего запроса передаётся всем ожидающим.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Future
+        self.leaders = 0
+        self.saved_calls = 0
+
+    def join(self, key: str):
+        """Возвращает future уже летящего запроса с таким ключом или None."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.saved_calls += 1
+        return future
+
+    def lead(self, key: str) -> asyncio.Future:
+        """Регистрирует текущего вызывающего ведущим для ключа."""
+        future = asyncio.get_running_loop().create_future()
+        # Ошибку может никто не ждать — помечаем её прочитанной, чтобы asyncio не ругался в лог
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self.leaders += 1
+        return future
+
+    def resolve(self, key: str, result):
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def fail(self, key: str, error: Exception):
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "saved_calls": self.saved_calls}
+
+
+# ✅ Общий single-flight для сегментов перевода
+translation_flights = SingleFlight()
+
+
+def split_into_paragraphs(text: str) -> list:
+    """Делит текст на абзацы по пустым строкам (<br><br> после prepare_text_for_translation).
+
+    Абзацы склеиваются обратно, если HTML-тег открыт в одном абзаце и закрыт в следующем.
+    """
+    paragraphs = []
+    open_tags = []
+    current = None
+
+    for part in re.split(r'\n[ \t]*\n+', text):
+        current = part if current is None else f"{current}\n\n{part}"
+
+        for closing, tag in HTML_TAG_RE.findall(part):
+            tag = tag.lower()
+            if tag in HTML_VOID_TAGS:
+                continue
+            if not closing:
+                open_tags.append(tag)
+            elif tag in open_tags:
+                del open_tags[len(open_tags) - 1 - open_tags[::-1].index(tag)]
+
+        if not open_tags:
+            paragraphs.append(current)
+            current = None
+
+    if current is not None:
+        paragraphs.append(current)
+    return paragraphs
+
+
+def protect_spans(text: str) -> tuple:
+    """Заменяет непереводимые фрагменты компактными плейсхолдерами <x i=N/>.
+
+    Возвращает (текст с плейсхолдерами, список исходных фрагментов).
+    Эмодзи и числа заменяются, только если плейсхолдер короче самого фрагмента.
+    """
+    spans = []
+
+    def replace(fragment: str, always: bool = True) -> str:
+        placeholder = PLACEHOLDER_TEMPLATE.format(len(spans))
+        if not always and len(placeholder) >= len(fragment):
+            return fragment
+        spans.append(fragment)
+        return placeholder
+
+    # 1️⃣ Блоки <pre>/<code> целиком (вместе с тегами)
+    text = PROTECTED_BLOCK_RE.sub(lambda match: replace(match.group(0)), text)
+
+    # 2️⃣ Ссылки, упоминания, хэштеги, числа и эмодзи — только в тексте, не внутри тегов
+    def replace_inline(match):
+        if match.lastgroup in ("emoji", "number"):
+            return replace(match.group(0), always=False)
+        return replace(match.group(0))
+
+    parts = re.split(r'(<[^<>]+>)', text)
+    for index, part in enumerate(parts):
+        if part and not part.startswith("<"):
+            parts[index] = PROTECTED_INLINE_RE.sub(replace_inline, part)
+    return "".join(parts), spans
+
+
+def restore_spans(text: str, spans: list) -> str:
+    """Возвращает на место фрагменты, заменённые protect_spans."""
+    if not spans:
+        return text
+
+    def restore(match):
+        index = int(match.group(1))
+        return spans[index] if index < len(spans) else ""
+
+    return PLACEHOLDER_RE.sub(restore, text)
+
+
+def has_translatable_text(text: str) -> bool:
+    """Есть ли в тексте буквы вне HTML-тегов и плейсхолдеров."""
+    return any(char.isalpha() for char in re.sub(r'<[^<>]*>|&\w+;|&#\d+;', '', text))
+
+
+def join_paragraphs(paragraphs: list) -> str:
+    """Собирает переведённые абзацы с тем же форматированием, что даёт restore_line_breaks."""
+    text = "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
     text = re.sub(r'\n{3,}', '\n\n', text)  # Убираем лишние пустые строки
     return text.strip()
 
-async def deepL_translate(text, target_lang):
-    """Отправляет запрос в DeepL API и получает перевод текста, сохраняя HTML-разметку и отступы."""
-    url = "https://api-free.deepl.com/v2/translate"
-    
-    headers = {"Authorization": f"DeepL-Auth-Key {DEEPL_API_KEY}"}
-    prepared_text = prepare_text_for_translation(text)  # Заменяем \n на <br>
-    
-    data = {
-        "text": prepared_text,
-        "target_lang": target_lang.upper(),
-        "tag_handling": "html",  # Сообщаем DeepL, что текст содержит HTML
-        "ignore_tags": "b, i, u, s, code, pre, a",  # Теги, которые НЕ нужно переводить
-        "preserve_formatting": "1",  # Сохраняем пробелы и отступы
-        "split_sentences": "nonewlines",  # Не разбиваем текст на новые строки
-        "formality": "default"
-    }
-
-    print(f"🔄 Отправляем в DeepL ({target_lang}): {html.escape(prepared_text)}")
-
-    async with aiohttp.ClientSession() as session:
+
+# ✅ Язык оригинала каждого главного канала (по ответам бэкенда)
+source_languages = SourceLanguageMemory()
+
+
+def choose_source_language(texts: list, target_lang: str, source_chat_id=None) -> tuple:
+    """Возвращает (язык по локальной проверке, язык-подсказку для бэкенда).
+
+    Локальная догадка важнее запомненного языка канала. Подсказка относится ко всей пачке,
+    поэтому её не передаём, если хоть один сегмент ей противоречит (русский пост с английскими
+    кнопками) — тогда бэкенд определит язык сам. Не передаём и совпадающую с целевым языком.
+    """
+    if not SOURCE_LANGUAGE_DETECTION:
+        return None, None
+    guess = detect_language(" ".join(texts))
+    source_lang = guess or source_languages.get(source_chat_id)
+    if source_lang and not all(fits_language(text, source_lang) for text in texts):
+        source_lang = None
+    if source_lang and source_lang == base_language(target_lang):
+        source_lang = None
+    return guess, source_lang
+
+
+def remember_source_language(translations: list, source_chat_id, guess: str = None):
+    """Запоминает язык канала: самый частый из определённых бэкендом, иначе локальную догадку."""
+    if source_chat_id is None:
+        return
+    detected = Counter(
+        language for language in (getattr(text, "detected_source_language", None) for text in translations) if language
+    )
+    language = detected.most_common(1)[0][0] if detected else guess
+    if language:
+        source_languages.remember(source_chat_id, language)
+
+
+async def backend_translate_batch(texts: list, target_lang: str, source_lang: str = None) -> list:
+    """Переводит тексты через бэкенд пачками (по лимитам бэкенда).
+
+    Для текстов, которые не удалось перевести, в списке возвращается None.
+    """
+    backend = get_translation_backend()
+    translations = []
+
+    for batch in backend.split_batches(texts):
+        print(f"🔄 Отправляем в {backend.name} ({target_lang}): {len(batch)} сегм. — {html.escape(' | '.join(batch))}")
+
         try:
-            async with session.post(url, headers=headers, data=data) as response:
-                result = await response.json()
-                if response.status == 200 and "translations" in result:
-                    translated_text = result["translations"][0]["text"]
-                    translated_text = restore_line_breaks(translated_text)  # Восстанавливаем отступы
-                    print(f"✅ Получили перевод ({target_lang}): {html.escape(translated_text)}")
-                    return translated_text
+            batch_translations = await backend.translate_batch(batch, target_lang, source_lang)
+            print(f"✅ Получили перевод ({target_lang}): {html.escape(' | '.join(batch_translations))}")
+            translations.extend(batch_translations)
+        except Exception as e:
+            print(f"⚠ Ошибка перевода ({target_lang}): {e}")
+            translations.extend([None] * len(batch))
+
+    if hasattr(backend, "stats"):
+        print(f"📈 Бэкенд {backend.name}: {backend.stats()}")
+    return translations
+
+
+async def memory_get_translations(source_hashes: list, target_lang: str) -> dict:
+    """Читает переводы из памяти переводов в БД (ошибки БД не мешают переводу)."""
+    if not TRANSLATION_MEMORY_ENABLED or not source_hashes:
+        return {}
+    try:
+        async with AsyncSessionLocal() as session:
+            return await orm_get_translations(session, source_hashes, target_lang.upper())
+    except Exception as e:
+        print(f"⚠ Ошибка чтения памяти переводов: {e}")
+        return {}
+
+
+async def memory_save_translations(items: list, target_lang: str):
+    """Сохраняет новые переводы в память переводов в БД."""
+    if not TRANSLATION_MEMORY_ENABLED or not items:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            await orm_save_translations(session, items, target_lang.upper())
+    except Exception as e:
+        print(f"⚠ Ошибка записи памяти переводов: {e}")
+
+
+async def prune_translation_memory_periodically(
+    interval: float = TRANSLATION_MEMORY_PRUNE_INTERVAL,
+    max_age_days: int = TRANSLATION_MEMORY_MAX_AGE_DAYS
+):
+    """Фоновая задача: периодически удаляет давно не использованные переводы."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                removed = await orm_prune_translation_memory(session, max_age_days)
+            print(f"🧹 Память переводов: удалено {removed} устаревших записей")
+        except Exception as e:
+            print(f"⚠ Ошибка очистки памяти переводов: {e}")
+        await asyncio.sleep(interval)
+
+
+async def translate_segments(texts: list, target_lang: str, source_lang: str = None, usage: Counter = None) -> list:
+    """Переводит сегменты на один язык, возвращает переводы в том же порядке (None — если сегмент не перевёлся).
+
+    Порядок поиска: кэш в памяти → уже летящий такой же запрос → память переводов в БД → DeepL
+    (каждая уникальная строка — один раз). В `usage["billed_characters"]` прибавляются символы,
+    которые этот вызов перевёл через DeepL.
+    """
+    options = get_translation_backend().cache_options(target_lang)
+    results = [None] * len(texts)
+    missing = {}  # текст -> (ключ, индексы в texts)
+    waiting = {}  # текст -> (future чужого запроса, индексы в texts)
+
+    for index, text in enumerate(texts):
+        if text in missing:
+            missing[text][1].append(index)
+            continue
+        if text in waiting:
+            waiting[text][1].append(index)
+            continue
+
+        key = translation_cache.make_key(text, target_lang, options)
+        cached = translation_cache.get(key) if translation_cache.is_cacheable(text) else None
+        if cached is not None:
+            results[index] = cached
+            continue
+
+        # ✅ Такой же сегмент уже переводит другая корутина — ждём её результат
+        future = translation_flights.join(key)
+        if future is not None:
+            waiting[text] = (future, [index])
+        else:
+            translation_flights.lead(key)
+            missing[text] = (key, [index])
+
+    try:
+        # ✅ Ищем промахи кэша в памяти переводов
+        if missing:
+            stored = await memory_get_translations([key for key, _ in missing.values()], target_lang)
+            for text in list(missing):
+                key, indexes = missing[text]
+                if key in stored:
+                    if translation_cache.is_cacheable(text):
+                        translation_cache.set(key, stored[key])
+                    translation_flights.resolve(key, stored[key])
+                    for index in indexes:
+                        results[index] = stored[key]
+                    del missing[text]
+
+        # ✅ Оставшееся отправляем в DeepL
+        if missing:
+            missing_texts = list(missing)
+            translations = await backend_translate_batch(missing_texts, target_lang, source_lang)
+            new_items = []
+
+            for text, translation in zip(missing_texts, translations):
+                key, indexes = missing[text]
+                if translation is not None:
+                    # Перевод мог сделать другой движок (запасной) — кэшируем под его параметрами
+                    produced_by = getattr(translation, "cache_options", None)
+                    stored_key = key
+                    if produced_by is not None and produced_by != options:
+                        stored_key = translation_cache.make_key(text, target_lang, produced_by)
+                    # Ошибки не попадают ни в кэш, ни в БД
+                    if translation_cache.is_cacheable(text):
+                        translation_cache.set(stored_key, translation)
+                    new_items.append((stored_key, text, translation))
+                    translation_flights.resolve(key, translation)
+                    if usage is not None:
+                        usage["billed_characters"] += len(text)
                 else:
-                    print(f"⚠ Ошибка перевода ({target_lang}): {result}")
-                    return f"⚠ Ошибка перевода ({target_lang})"
+                    translation_flights.fail(key, TranslationError(f"Не удалось перевести сегмент на {target_lang}"))
+                for index in indexes:
+                    results[index] = translation
+
+            await memory_save_translations(new_items, target_lang)
+    except BaseException as e:
+        # Ожидающие не должны зависнуть, если ведущий запрос упал или был отменён
+        for key, _ in missing.values():
+            translation_flights.fail(key, e if isinstance(e, Exception) else TranslationError("Перевод отменён"))
+        raise
+
+    # ✅ Забираем результаты запросов, к которым присоединились
+    for text, (future, indexes) in waiting.items():
+        try:
+            translation = await asyncio.shield(future)
         except Exception as e:
-            print(f"⚠ Ошибка API ({target_lang}): {e}")
-            return f"⚠ Ошибка API ({target_lang})"
+            print(f"⚠ Совместный перевод не удался ({target_lang}): {e}")
+            translation = None
+        for index in indexes:
+            results[index] = translation
+
+    print(f"📦 Кэш переводов: {translation_cache.stats()}, single-flight: {translation_flights.stats()}")
+    return results
+
+
+async def translate_texts(texts: list, target_lang: str, source_chat_id=None, usage: Counter = None) -> list:
+    """Переводит список текстов (текст сообщения, подписи кнопок) на один язык, возвращает переводы в том же порядке.
+
+    Каждый текст делится на абзацы, и все абзацы всех текстов уходят одной пачкой:
+    повторяющиеся шапки, дисклеймеры и подписи берутся из кэша, а в DeepL идут только новые абзацы.
+    Ссылки, упоминания, хэштеги, код и т.п. заменяются плейсхолдерами и в DeepL не отправляются.
+    Если текст уже на целевом языке или в нём нет букв, бэкенд не вызывается вовсе.
+    Язык оригинала запоминается для `source_chat_id` и передаётся бэкенду подсказкой.
+    Оплачиваемые символы (ушедшие в DeepL) прибавляются к `usage`, если он передан.
+    Если что-то перевести не удалось, выбрасывает TranslationError.
+    """
+    if not texts:
+        return []
+
+    if target_lang.upper() not in await get_translation_backend().supported_languages():
+        raise UnsupportedLanguageError(f"Перевод недоступен для {target_lang.upper()}")
+
+    documents = []
+    segments = []
+    original_chars = protected_chars = 0
+
+    for text in texts:
+        paragraphs = []
+        for paragraph in split_into_paragraphs(text):
+            protected, spans = protect_spans(paragraph)
+            translatable = has_translatable_text(protected)
+            if translatable:
+                segments.append(protected)
+                original_chars += len(paragraph)
+                protected_chars += len(protected)
+            paragraphs.append((paragraph, protected, spans, translatable))
+        documents.append(paragraphs)
+
+    if original_chars:
+        saved = original_chars - protected_chars
+        print(f"🛡 Защита спанов ({target_lang}): {original_chars} → {protected_chars} символов (экономия {saved}, {saved * 100 // original_chars}%)")
+
+    if not segments:
+        return list(texts)  # Ни одной буквы — переводить нечего
+
+    guess, source_lang = choose_source_language(segments, target_lang, source_chat_id)
+    if guess and guess == base_language(target_lang):
+        print(f"⏭ Текст уже на {target_lang.upper()} — перевод не нужен")
+        return list(texts)
+
+    translated_segments = await translate_segments(segments, target_lang, source_lang, usage)
+    remember_source_language(translated_segments, source_chat_id, guess)
+    translated_segments = iter(translated_segments)
+
+    results = []
+    for paragraphs in documents:
+        translated_paragraphs = []
+        for paragraph, protected, spans, translatable in paragraphs:
+            if not translatable:
+                translated_paragraphs.append(paragraph)  # Переводить нечего — оставляем как есть
+                continue
+            translated = next(translated_segments)
+            translated_paragraphs.append(restore_spans(translated, spans) if translated is not None else None)
+
+        if any(paragraph is None for paragraph in translated_paragraphs):
+            # ❌ Не отдаём наружу частичный перевод или текст ошибки — его нельзя публиковать
+            raise TranslationError(f"Не удалось перевести текст на {target_lang}")
+        results.append(join_paragraphs(translated_paragraphs))
+    return results
+
 
 async def translate_text(text: str, target_lang: str) -> str:
     """Переводит текст через DeepL API, сохраняя форматирование и отступы."""
-    
-    if target_lang.upper() not in SUPPORTED_LANGUAGES:
-        return f"⚠ Перевод недоступен для {target_lang.upper()}"
-
-    translated_text = await deepL_translate(text, target_lang)
-    return translated_text
+    translations = await translate_texts([text], target_lang)
+    return translations[0]
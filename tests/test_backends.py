@@ -0,0 +1,47 @@
+import asyncio
+import socket
+from services import translator
+from services.backends import DEFAULT_LANGUAGES, DeepLBackend, ProcessPoolBackend
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_languages_fallback_is_cached_while_api_is_down():
+    async def scenario():
+        backend = DeepLBackend(api_key="test", url=f"http://127.0.0.1:{unused_port()}/v2/translate")
+        requests = 0
+        session_get = backend.session.get
+
+        def counting_get(*args, **kwargs):
+            nonlocal requests
+            requests += 1
+            return session_get(*args, **kwargs)
+
+        backend.session.get = counting_get
+        try:
+            assert await backend.supported_languages() == DEFAULT_LANGUAGES
+            assert await backend.supported_languages() == DEFAULT_LANGUAGES
+            assert requests == 1  # Второй пост не ходит в API до истечения LANGUAGES_RETRY_SECONDS
+
+            backend._languages_expires_at = 0  # Срок вышел — пробуем снова
+            await backend.supported_languages()
+            assert requests == 2
+        finally:
+            await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_translation_backend_builds_local_backend_from_config(monkeypatch):
+    monkeypatch.setattr(translator, "TRANSLATOR_BACKEND", "local")
+    monkeypatch.setattr(translator, "LOCAL_TRANSLATOR_ENGINE", "services.local_engines:dummy_engine")
+    monkeypatch.setattr(translator, "_backend", None)
+
+    backend = translator.get_translation_backend()
+
+    assert isinstance(backend, ProcessPoolBackend)
+    assert backend.engine == "services.local_engines:dummy_engine"
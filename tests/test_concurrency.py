@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+from middlewares.concurrency import ConcurrencyLimitMiddleware
+from services.media_groups import MediaGroupCollector
+
+
+def channel_post(message_id: int, media_group_id: str = None):
+    return SimpleNamespace(channel_post=SimpleNamespace(message_id=message_id, media_group_id=media_group_id))
+
+
+def test_album_is_collected_before_taking_a_slot():
+    async def scenario():
+        collector = MediaGroupCollector(quiet_period=0.05, max_wait=1)
+        limiter = ConcurrencyLimitMiddleware(limit=2, media_groups=collector)
+        albums = []
+        release = asyncio.Event()
+
+        async def handler(event, data):
+            if "album" in data:
+                albums.append([message.message_id for message in data["album"]])
+            else:
+                await release.wait()  # Обычные посты держат слоты, пока приходит альбом
+
+        busy = [asyncio.create_task(limiter(handler, channel_post(i), {})) for i in (1, 2)]
+        await asyncio.sleep(0)
+        parts = []
+        for message_id in (10, 11, 12):
+            parts.append(asyncio.create_task(limiter(handler, channel_post(message_id, "album"), {})))
+            await asyncio.sleep(0.01)
+
+        await asyncio.sleep(0.1)  # Тишина — альбом собран, пока слоты ещё заняты
+        release.set()
+        await asyncio.gather(*busy, *parts)
+
+        assert albums == [[10, 11, 12]]
+        assert collector.late_parts == 0
+        assert limiter.pending == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from aiohttp import web
+from services.backends import DeepLBackend, QuotaExceededError, TranslationError
+from services.fake_deepl import FakeDeepLState, create_fake_deepl_app
+
+
+async def start_fake_deepl(state: FakeDeepLState):
+    runner = web.AppRunner(create_fake_deepl_app(state))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v2/translate"
+
+
+def test_exhausted_quota_recovers_after_reset():
+    async def scenario():
+        state = FakeDeepLState(latency=0, character_limit=10)
+        runner, url = await start_fake_deepl(state)
+        backend = DeepLBackend(api_key="test", url=url, max_retries=0, quota_recheck_interval=0.05)
+        try:
+            await backend.refresh_usage()
+            with pytest.raises(QuotaExceededError):
+                await backend.translate_batch(["Длинный текст поста"], "EN")
+            assert backend.quota.exhausted
+
+            # Пока не прошёл интервал перепроверки — отказываем без запроса к API
+            requests = state.requests
+            with pytest.raises(QuotaExceededError):
+                await backend.translate_batch(["Привет"], "EN")
+            assert state.requests == requests
+
+            # Новый расчётный период: DeepL обнулил счётчик
+            state.character_count = 0
+            state.character_limit = 1000
+            await asyncio.sleep(0.06)
+
+            translations = await backend.translate_batch(["Привет"], "EN")
+            assert translations == ["[EN] Привет"]
+            assert not backend.quota.exhausted
+        finally:
+            await backend.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_refresh_usage_clears_flag_when_characters_are_left():
+    async def scenario():
+        state = FakeDeepLState(latency=0, character_limit=1000)
+        runner, url = await start_fake_deepl(state)
+        backend = DeepLBackend(api_key="test", url=url)
+        try:
+            backend.quota.mark_exhausted()
+            await backend.refresh_usage()
+            assert not backend.quota.exhausted
+            assert backend.quota.limit == 1000
+        finally:
+            await backend.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_local_limit_is_kept_and_rechecked():
+    async def scenario():
+        state = FakeDeepLState(latency=0, character_limit=1000)
+        runner, url = await start_fake_deepl(state)
+        backend = DeepLBackend(api_key="test", url=url, character_quota=5, quota_recheck_interval=0)
+        try:
+            backend.quota.used = 5
+            with pytest.raises(QuotaExceededError):
+                await backend.translate_batch(["Привет"], "EN")
+
+            # /v2/usage показал, что расход сброшен — локальный лимит из конфига остаётся прежним
+            await backend.refresh_usage()
+            assert backend.quota.limit == 5
+            assert backend.quota.used == 0
+            assert not backend.quota.exhausted
+        finally:
+            await backend.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_long_retry_after_fails_instead_of_retrying_early():
+    async def scenario():
+        state = FakeDeepLState(latency=0, rate_limit_rate=1, retry_after=60)
+        runner, url = await start_fake_deepl(state)
+        backend = DeepLBackend(api_key="test", url=url, max_retries=4, backoff_max=5)
+        try:
+            assert backend.backoff_delay(0, "3") == 3
+            assert backend.backoff_delay(10) <= 5
+            with pytest.raises(TranslationError):
+                await backend.translate_batch(["Привет"], "EN")
+            assert state.requests == 1
+        finally:
+            await backend.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_retry_is_skipped_when_it_cannot_finish_before_deadline():
+    async def scenario():
+        state = FakeDeepLState(latency=0, error_rate=1)
+        runner, url = await start_fake_deepl(state)
+        backend = DeepLBackend(api_key="test", url=url, max_retries=4, total_timeout=10, deadline=5)
+        try:
+            with pytest.raises(TranslationError):
+                await backend.translate_batch(["Привет"], "EN")
+            assert state.requests == 1
+        finally:
+            await backend.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+import pytest
+from services.language import detect_language
+from services.translator import choose_source_language, source_languages
+
+
+@pytest.mark.parametrize("text, language", [
+    ("Check out our new store in Berlin, it is open now for you and your friends", "EN"),
+    ("Wir haben jetzt einen neuen Laden und der ist auch am Sonntag für Sie offen", "DE"),
+    ("Наш новый магазин уже открыт, ждём вас каждый день", "RU"),
+    ("新しい店がオープンしました", "JA"),
+])
+def test_single_script_text_is_detected(text, language):
+    assert detect_language(text) == language
+
+
+@pytest.mark.parametrize("text", [
+    "Привет! Check our new store in Berlin, it is open now for you",
+    "Скидки в нашем магазине: the best prices in the city are now here",
+    "Ελα! The new store is open now and we are waiting for you",
+    "Новый iPhone уже в продаже",
+])
+def test_mixed_script_text_is_left_to_backend(text):
+    assert detect_language(text) is None
+
+
+def test_links_and_mentions_do_not_count_as_foreign_script():
+    text = "Наш новый магазин открыт, подробности https://example.com/store и @shop_bot"
+
+    assert detect_language(text) == "RU"
+
+
+@pytest.mark.parametrize("text", [
+    "Привіт! Наш новий магазин вже відкритий, чекаємо на вас щодня",
+    "Нашият нов магазин вече е отворен, очакваме ви всеки ден",
+    "Новият магазин в България е отворен със страхотни цени",
+    "Наша нова продавница је отворена сваког дана",
+])
+def test_other_cyrillic_languages_are_not_russian(text):
+    assert detect_language(text) is None
+
+
+def test_remembered_language_is_not_forced_on_contradicting_segments():
+    source_languages.remember(-100, "RU")
+    texts = ["Наш новый магазин открыт, ждём вас каждый день", "Buy now"]
+
+    assert choose_source_language(texts, "DE", source_chat_id=-100) == (None, None)
+    assert choose_source_language(["Привіт! Наш новий магазин вже відкритий"], "DE", source_chat_id=-100) == (None, None)
+    assert choose_source_language(["Скидки до 50%", "Подробнее"], "DE", source_chat_id=-100) == (None, "RU")
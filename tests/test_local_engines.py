@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from services import translator
+from services.backends import FallbackBackend, ProcessPoolBackend, QuotaExceededError
+from services.local_engines import DummyEngine
+
+DUMMY_ENGINE = "services.local_engines:dummy_engine"
+
+
+def test_dummy_engine_is_deterministic():
+    engine = DummyEngine(work_per_char=1)
+
+    assert engine.translate(["Привет", "мир"], "en") == ["[EN] Привет", "[EN] мир"]
+    assert engine.translate(["Привет"], "EN") == engine.translate(["Привет"], "EN")
+
+
+def test_process_pool_translates_and_coalesces_batches():
+    async def scenario():
+        backend = ProcessPoolBackend(DUMMY_ENGINE, workers=2, batch_window=0.05)
+        try:
+            results = await asyncio.gather(
+                backend.translate_batch(["один"], "EN"),
+                backend.translate_batch(["два", "три"], "EN"),
+                backend.translate_batch(["один"], "DE"),
+            )
+            assert results == [["[EN] один"], ["[EN] два", "[EN] три"], ["[DE] один"]]
+            assert backend.batches == 2  # Одна пачка на язык
+            assert "EN" in await backend.supported_languages()
+        finally:
+            await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_process_pool_requires_engine():
+    with pytest.raises(ValueError):
+        ProcessPoolBackend(None)
+
+
+class ScriptedBackend:
+    """Бэкенд для теста: переводит префиксом или отвечает «квота кончилась»."""
+
+    def __init__(self, name: str, quota_exceeded: bool = False):
+        self.name = name
+        self.quota_exceeded = quota_exceeded
+
+    def split_batches(self, texts: list) -> list:
+        return [texts]
+
+    def cache_options(self, target_lang: str) -> tuple:
+        return (("engine", self.name), ("target_lang", target_lang.upper()))
+
+    async def translate_batch(self, texts: list, target_lang: str, source_lang: str = None) -> list:
+        if self.quota_exceeded:
+            raise QuotaExceededError("Квота исчерпана")
+        return [f"{self.name}: {text}" for text in texts]
+
+
+def test_fallback_translations_are_cached_under_fallback_engine(monkeypatch):
+    primary = ScriptedBackend("deepl", quota_exceeded=True)
+    backend = FallbackBackend(primary, ScriptedBackend("local"))
+    monkeypatch.setattr(translator, "_backend", backend)
+    monkeypatch.setattr(translator, "TRANSLATION_MEMORY_ENABLED", False)
+    translator.translation_cache.clear()
+
+    def cached(engine: ScriptedBackend, text: str):
+        return translator.translation_cache.get(translator.translation_cache.make_key(text, "EN", engine.cache_options("EN")))
+
+    # Квота кончилась на первом же вызове: ключ кэша считали ещё для основного движка
+    assert asyncio.run(translator.translate_segments(["Привет"], "EN")) == ["local: Привет"]
+    assert cached(primary, "Привет") is None
+    assert cached(backend.fallback, "Привет") == "local: Привет"
+
+    # Квота вернулась: новые переводы основного движка снова кэшируются под его ключом
+    primary.quota_exceeded = False
+    assert asyncio.run(translator.translate_segments(["Пока"], "EN")) == ["deepl: Пока"]
+    assert not backend.degraded
+    assert cached(primary, "Пока") == "deepl: Пока"
+    assert cached(backend.fallback, "Пока") is None
@@ -0,0 +1,69 @@
+import pytest
+from services.translator import PLACEHOLDER_RE, protect_spans, restore_spans
+
+
+@pytest.mark.parametrize("text, protected_fragment", [
+    ('Подробнее: https://example.com/path?a=1&b=2 сегодня', 'https://example.com/path?a=1&b=2'),
+    ('Ссылка www.example.org/news.', 'www.example.org/news'),
+    ('Пишите @support_team в личку', '@support_team'),
+    ('Новости #crypto и #BTC_2024', '#crypto'),
+    ('Цена 1 250 000 ₽ до пятницы', '1 250 000 ₽'),
+    ('Запуск 🎉🎉🎉🎉🎉🎉🎉🎉🎉 сегодня', '🎉🎉🎉🎉🎉🎉🎉🎉🎉'),
+    ('Команда <code>pip install -r requirements.txt</code> ставит всё', '<code>pip install -r requirements.txt</code>'),
+    ('До <pre>for i in range(10):\n    print(i)</pre> после', '<pre>for i in range(10):\n    print(i)</pre>'),
+])
+def test_fragment_is_replaced_and_restored(text, protected_fragment):
+    protected, spans = protect_spans(text)
+
+    assert protected_fragment in spans
+    assert protected_fragment not in protected
+    assert PLACEHOLDER_RE.search(protected)
+    assert restore_spans(protected, spans) == text
+
+
+def test_short_numbers_and_single_emoji_stay_in_text():
+    # Плейсхолдер длиннее самого фрагмента — заменять невыгодно
+    protected, spans = protect_spans("Осталось 3 места 🔥")
+
+    assert spans == []
+    assert protected == "Осталось 3 места 🔥"
+
+
+def test_links_inside_tags_are_not_touched():
+    text = '<a href="https://example.com/a">Наш сайт</a> и https://example.com/b'
+    protected, spans = protect_spans(text)
+
+    assert spans == ["https://example.com/b"]
+    assert '<a href="https://example.com/a">' in protected
+    assert restore_spans(protected, spans) == text
+
+
+@pytest.mark.parametrize("echo", ['<x i="{}"></x>', '<x i="{}"/>', '<x i={}/>', '<x i={}>'])
+def test_restore_accepts_deepl_echo_forms(echo):
+    text = "Пишите @support, читайте https://example.com и #news"
+    protected, spans = protect_spans(text)
+
+    # DeepL возвращает плейсхолдеры в нормализованном XML-виде
+    translated = "Write {} , read {} and {}".format(*(echo.format(index) for index in range(len(spans))))
+
+    assert restore_spans(translated, spans) == "Write @support , read https://example.com and #news"
+
+
+def test_restore_keeps_translated_order():
+    protected, spans = protect_spans("@alice и @bob")
+    assert protected == "<x i=0/> и <x i=1/>"
+
+    # Перевод может поменять плейсхолдеры местами
+    assert restore_spans('<x i="1"></x> and <x i="0"></x>', spans) == "@bob and @alice"
+
+
+def test_unknown_placeholder_is_dropped():
+    assert restore_spans('text <x i="5"></x>', ["@alice"]) == "text "
+
+
+def test_text_without_spans_is_unchanged():
+    text = "Обычный абзац <b>без</b> ссылок"
+    protected, spans = protect_spans(text)
+
+    assert (protected, spans) == (text, [])
+    assert restore_spans(protected, spans) == text
@@ -0,0 +1,64 @@
+import asyncio
+from services import stats_buffer
+from services.stats_buffer import StatisticsBuffer
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def use_fake_db(monkeypatch, delay: float = 0):
+    written = []
+
+    async def flush_statistics(session, totals, buckets):
+        await asyncio.sleep(delay)
+        written.append((totals, buckets))
+
+    monkeypatch.setattr(stats_buffer, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(stats_buffer, "orm_flush_statistics", flush_statistics)
+    return written
+
+
+def test_cancelled_flush_keeps_counters_for_final_flush(monkeypatch):
+    written = use_fake_db(monkeypatch, delay=0.1)
+
+    async def scenario():
+        buffer = StatisticsBuffer(max_staleness=10)
+        buffer.add(1, "два слова")
+        buffer.add_channels([(1, -100)], "EN", "два слова", billed_characters=9)
+
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)  # Запись уже идёт
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert buffer.pending(1) == (1, 2, 9)
+
+        await buffer.close()
+
+    asyncio.run(scenario())
+    totals, buckets = written[-1]
+    assert totals == {1: (1, 2, 9)}
+    assert list(buckets.values()) == [(1, 2, 9, 9)]
+
+
+def test_close_stops_run_loop_and_waits_for_running_flush(monkeypatch):
+    written = use_fake_db(monkeypatch, delay=0.1)
+
+    async def scenario():
+        buffer = StatisticsBuffer(max_staleness=0.01)
+        loop_task = asyncio.create_task(buffer.run())
+        buffer.add(1, "пост")
+        await asyncio.sleep(1.05)  # Первый сброс фонового цикла в процессе
+        buffer.add(1, "ещё пост")
+
+        await buffer.close()
+        await asyncio.wait_for(loop_task, timeout=1)
+
+        assert len(buffer) == 0
+
+    asyncio.run(scenario())
+    assert sum(totals[1][0] for totals, _ in written) == 2
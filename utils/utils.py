@@ -1,3 +1,4 @@
+import asyncio
 import os
 from aiogram.types import FSInputFile
 
@@ -11,4 +12,16 @@ def get_valid_file(file_path: str):
         print(f"❌ Файл не найден: {abs_path}")  # ✅ Логируем отсутствие файла
         return None  # ❌ Файл не найден
 
-    return FSInputFile(abs_path)  # ✅ Возвращаем `FSInputFile`
\ No newline at end of file
+    return FSInputFile(abs_path)  # ✅ Возвращаем `FSInputFile`
+
+
+# ✅ Запуск корутин параллельно, но не больше `limit` одновременно
+async def gather_limited(limit: int, *coros):
+    """Как asyncio.gather(return_exceptions=True), но одновременно выполняется не больше `limit` корутин."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=True)